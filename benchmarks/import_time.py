@@ -0,0 +1,96 @@
+"""
+Cold-start benchmark: how long importing each entry point takes, measured with
+``python -X importtime`` in fresh interpreters, and which heavy backends the
+import pulls in.
+
+    python benchmarks/import_time.py [--runs 5] [module ...]
+"""
+
+import argparse
+import importlib.util
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+DEFAULT_MODULES = ["core", "cli", "autorename", "async_resolver", "main"]
+
+# Backends that should only load once a code path needs them
+HEAVY_MODULES = [
+    "pdfplumber",
+    "pdfminer",
+    "googleapiclient",
+    "httplib2",
+    "PIL",
+    "tenacity",
+    "dotenv",
+    "multiprocessing",
+]
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """
+    Returns the cumulative import time in microseconds of every module listed
+    in ``-X importtime`` output.
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        times[parts[2].strip()] = int(parts[1])
+    return times
+
+
+def measure(module: str) -> Tuple[int, List[str]]:
+    """
+    Imports ``module`` in a fresh interpreter. Returns its cumulative import
+    time in microseconds and the heavy backends loaded afterwards.
+    """
+    probe = (
+        f"import sys, {module}; "
+        f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = parse_importtime(completed.stderr)
+    return times[module], completed.stdout.split()
+
+
+def is_importable(module: str) -> bool:
+    # main.py needs flet; importing it does not start the GUI
+    return module != "main" or importlib.util.find_spec("flet") is not None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument(
+        "--runs", type=int, default=5, help="Fresh interpreters per module."
+    )
+    args = parser.parse_args()
+
+    for module in args.modules:
+        if not is_importable(module):
+            print(f"{module:16} skipped (dependencies not installed)")
+            continue
+        results = [measure(module) for _ in range(args.runs)]
+        best = min(elapsed for elapsed, _ in results)
+        loaded = results[0][1]
+        print(
+            f"{module:16} {best / 1000:7.1f} ms (best of {args.runs})"
+            f"   heavy: {', '.join(loaded) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Micro-benchmark: fused single-pass ISBN scanner (src/utils.py) against the
+previous two-pass implementation, copied below.
+
+    python benchmarks/isbn_scan.py [--megabytes 4] [--repeat 5]
+"""
+
+import argparse
+import random
+import re
+import sys
+import timeit
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from utils import (  # noqa: E402
+    find_first_isbn,
+    is_valid_isbn10,
+    is_valid_isbn13,
+    iter_isbns,
+    rank_isbns,
+)
+
+# --- previous implementation -------------------------------------------------
+
+
+def legacy_normalize_isbn(isbn: str) -> str:
+    return re.sub(r"[- ]", "", isbn).upper()
+
+
+LEGACY_ISBN10_REGEX = re.compile(
+    r"(?<!\d)" r"\d[\- ]*" r"(?:\d[\- ]*){8}" r"[\dXx]" r"(?!\d)", re.UNICODE
+)
+LEGACY_ISBN13_REGEX = re.compile(
+    r"(?<!\d)(97[89](?:[\- ]*\d){10}|97[89]\d{10})(?!\d)", re.UNICODE
+)
+
+
+def legacy_extract_isbns(text: str) -> Tuple[List[str], List[str]]:
+    isbn10s = []
+    isbn13s = []
+    for raw in LEGACY_ISBN10_REGEX.findall(text):
+        norm = legacy_normalize_isbn(raw)
+        if is_valid_isbn10(norm) and norm not in isbn10s:
+            isbn10s.append(norm)
+    for raw in LEGACY_ISBN13_REGEX.findall(text):
+        norm = legacy_normalize_isbn(raw)
+        if is_valid_isbn13(norm) and norm not in isbn13s:
+            isbn13s.append(norm)
+    return isbn10s, isbn13s
+
+
+# --- synthetic book text -----------------------------------------------------
+
+WORDS = (
+    "the of and to in a is that for it as was with be by on not he this are or "
+    "his from at which but have an they you were her she there been one all we "
+    "page chapter figure table 1998 2004 12 345 6789 p. 42-57 vol. 3"
+).split()
+
+
+def make_pages(megabytes: float, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    pages = []
+    size = 0
+    while size < megabytes * 1_000_000:
+        words = [rng.choice(WORDS) for _ in range(600)]
+        if rng.random() < 0.05:
+            # Phone numbers, page ranges and other ISBN-shaped noise
+            words.insert(rng.randrange(600), "0 12 345 6789")
+        if rng.random() < 0.02:
+            words.insert(rng.randrange(600), "ISBN 978-0-306-40615-7")
+        page = " ".join(words) + "\n"
+        pages.append(page)
+        size += len(page)
+    # The copyright page near the front, as in most books
+    pages.insert(2, "Copyright 2004. All rights reserved. ISBN 0-306-40615-2\n")
+    return pages
+
+
+def bench(label: str, func, repeat: int) -> float:
+    best = min(timeit.repeat(func, number=1, repeat=repeat))
+    print(f"{label:<44} {best * 1000:9.2f} ms")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--megabytes", type=float, default=4.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = make_pages(args.megabytes)
+    text = "".join(pages)
+    print(f"{len(pages)} pages, {len(text) / 1_000_000:.1f} MB of text\n")
+
+    legacy_found = legacy_extract_isbns(text)
+    assert "0306406152" in legacy_found[0] and "9780306406157" in legacy_found[1]
+    assert "9780306406157" in iter_isbns([text])
+
+    legacy = bench(
+        "legacy extract_isbns (two passes)",
+        lambda: legacy_extract_isbns(text),
+        args.repeat,
+    )
+    fused = bench("fused iter_isbns", lambda: list(iter_isbns([text])), args.repeat)
+    bench("fused rank_isbns", lambda: rank_isbns(text), args.repeat)
+    streamed = bench(
+        "streamed find_first_isbn (early exit)",
+        lambda: find_first_isbn(iter(pages)),
+        args.repeat,
+    )
+    print(
+        f"\nfused: {legacy / fused:.1f}x, streamed first hit: {legacy / streamed:.0f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
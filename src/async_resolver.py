@@ -0,0 +1,235 @@
+import asyncio
+import logging
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Iterable, AsyncIterator
+
+from config import get_api_key
+from core import (
+    DEFAULT_STRATEGY,
+    check_strategy,
+    collect_file_evidence,
+    early_answer,
+    fetch_and_store,
+    lookup_cached,
+    merge_parallel_answers,
+    not_found,
+    plan_parallel_queries,
+    plan_queries,
+    probe_matches,
+    rank_answer,
+    results_from_items,
+    select_probe_answer,
+    split_probes,
+    step_timer,
+)
+from file_cache import get_file_cache
+from instrumentation import count, timer
+from lookup_cache import normalize_query
+
+logger = logging.getLogger("bookinfo")
+
+DEFAULT_CONCURRENCY = 8
+
+
+class AsyncBookResolver:
+    """
+    Asyncio lookup pipeline with a cap on concurrent requests and coalescing of
+    identical in-flight queries. Lookups follow the same plans, caches and
+    strategies as core.get_books_info_list, from the same core helpers; requests
+    take their tokens from the process-wide rate limiter (see
+    retry_policy.get_rate_limiter) like every other lookup path.
+
+    Usage:
+        resolver = AsyncBookResolver(max_concurrency=8)
+        async for entry in resolver.resolve_many(paths):
+            ...
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        use_cache: bool = True,
+        strategy: str = DEFAULT_STRATEGY,
+    ):
+        self.api_key = api_key or get_api_key()
+        self.max_concurrency = max_concurrency
+        self.use_cache = use_cache
+        self.strategy = check_strategy(strategy)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def query(self, query: str) -> List[Dict[str, Any]]:
+        """
+        Async counterpart of core.query_google_books_api.
+        """
+        items = await asyncio.to_thread(lookup_cached, query, self.use_cache)
+        if items is not None:
+            return items
+        key = normalize_query(query)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(query))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            count("coalesced_queries")
+            logger.info(f"Coalesced duplicate query: {query}")
+        # Shield so one cancelled caller does not cancel the request for the others
+        return await asyncio.shield(task)
+
+    async def _fetch(self, query: str) -> List[Dict[str, Any]]:
+        async with self._semaphore:
+            return await asyncio.to_thread(
+                fetch_and_store, query, self.api_key, self.use_cache
+            )
+
+    async def query_step(self, step: Dict[str, Any]) -> List[Dict[str, Any]]:
+        with step_timer(step, self.strategy) as t:
+            items = await self.query(step["query"])
+            t.labels["found"] = bool(items)
+        return items
+
+    async def _run_probes(
+        self, steps: List[Dict[str, Any]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Async counterpart of core.run_probe_steps: the first probe answering with
+        a matching title wins and the other probes are cancelled.
+        """
+        tasks = {
+            asyncio.create_task(self.query_step(step)): i
+            for i, step in enumerate(steps)
+        }
+        answers = {}
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    i = tasks[task]
+                    answers[i] = task.result()
+                    if probe_matches(steps[i], answers[i]):
+                        return results_from_items(steps[i], answers[i])
+        finally:
+            for task in pending:
+                task.cancel()
+        return select_probe_answer(steps, answers)
+
+    async def _resolve_candidates(
+        self, evidence: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """
+        Async counterpart of core._resolve_candidates.
+        """
+        steps, probes = split_probes(plan_queries(evidence))
+        for step in steps:
+            logger.info(f"Querying Google Books ({step['source']}): {step['query']}")
+            results = results_from_items(step, await self.query_step(step))
+            if results is not None:
+                return results
+        if probes:
+            results = await self._run_probes(probes)
+            if results is not None:
+                return results
+        return not_found(evidence)
+
+    async def _resolve_parallel(self, evidence: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Async counterpart of core.resolve_parallel.
+        """
+        steps = plan_parallel_queries(evidence)
+        outcomes = await asyncio.gather(
+            *(self.query_step(step) for step in steps), return_exceptions=True
+        )
+        return merge_parallel_answers(evidence, steps, outcomes)
+
+    async def resolve_evidence(self, evidence: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Async counterpart of core.resolve_books_info.
+        """
+        with timer("resolve", strategy=self.strategy) as t:
+            if self.strategy == "parallel":
+                results = await self._resolve_parallel(evidence)
+            else:
+                results = await self._resolve_candidates(evidence)
+            results = rank_answer(results, evidence, self.strategy)
+            t.labels["source"] = results[0]["source"]
+        return results
+
+    async def resolve(self, file_path: str) -> List[Dict[str, Any]]:
+        """
+        Async counterpart of core.get_books_info_list.
+        """
+        with timer("get_books_info_list", strategy=self.strategy) as t:
+            results = await self._resolve(file_path)
+            t.labels["source"] = results[0]["source"] if results else None
+        return results
+
+    async def _resolve(self, file_path: str) -> List[Dict[str, Any]]:
+        # SQLite reads, file hashing and parsing run off the event loop
+        cache = get_file_cache() if self.use_cache else None
+        answer = await asyncio.to_thread(
+            early_answer, file_path, self.api_key, cache, self.strategy
+        )
+        if answer is not None:
+            return answer[0]
+        with timer("evidence", strategy=self.strategy):
+            evidence = await asyncio.to_thread(
+                collect_file_evidence,
+                file_path,
+                None,
+                self.strategy == "parallel",
+            )
+        results = await self.resolve_evidence(evidence)
+        if cache is not None:
+            await asyncio.to_thread(cache.set, file_path, results, evidence)
+        return results
+
+    async def resolve_many(
+        self, file_paths: Iterable[str | Path], max_pending: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Resolves the files concurrently and yields {"file_path", "results", "error"}
+        dicts as they complete. At most ``max_pending`` files (default: four per
+        allowed concurrent request) are in progress at once, so ``file_paths`` may
+        be a lazy iterable of any length.
+        """
+        max_pending = max_pending or 4 * self.max_concurrency
+
+        async def run(path: str) -> Dict[str, Any]:
+            try:
+                return {
+                    "file_path": path,
+                    "results": await self.resolve(path),
+                    "error": None,
+                }
+            except Exception as e:
+                logger.error(f"Failed to resolve {path}: {e}")
+                return {
+                    "file_path": path,
+                    "results": [],
+                    "error": f"{type(e).__name__}: {e}",
+                }
+
+        paths = iter(file_paths)
+        pending = set()
+        try:
+            while True:
+                while len(pending) < max_pending:
+                    path = next(paths, None)
+                    if path is None:
+                        break
+                    pending.add(asyncio.create_task(run(str(path))))
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,205 @@
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Dict, Any, List, Iterable, Iterator
+
+from config import configure
+from cli import iter_input_paths
+from core import DEFAULT_STRATEGY, STRATEGIES, iter_books_info_batch
+from ranking import ensure_ranked
+from utils import COMPLETED_DIR, build_new_filename_from_info, move_to_completed
+
+logger = logging.getLogger("bookinfo")
+
+DEFAULT_THRESHOLD = 0.85
+
+
+def plan_renames(
+    file_paths: Iterable[str],
+    threshold: float = DEFAULT_THRESHOLD,
+    **batch_options,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Resolves the files in parallel and yields one plan entry per file with the
+    top candidate, its confidence, the target path and an action:
+    "rename" (confidence at or above ``threshold``), "review" or "error".
+    """
+    claimed = set()
+    for entry in iter_books_info_batch(
+        file_paths, include_evidence=True, **batch_options
+    ):
+        file_path = Path(entry["file_path"])
+        plan = {
+            "file_path": str(file_path),
+            "action": "review",
+            "confidence": 0.0,
+            "candidate": None,
+            "target": None,
+            "candidates": entry["results"][:3],
+            "error": entry["error"],
+        }
+        if entry["error"]:
+            plan["action"] = "error"
+            yield plan
+            continue
+        # Batch results come ranked; only entries cached before ranking are ranked here
+        evidence = entry.get("evidence") or {"filename": file_path.name}
+        ranked = ensure_ranked(entry["results"], evidence)
+        plan["candidates"] = ranked[:3]
+        if ranked and ranked[0].get("title"):
+            candidate = ranked[0]
+            confidence = candidate["confidence"]
+            target = (
+                file_path.parent
+                / COMPLETED_DIR
+                / build_new_filename_from_info(candidate, file_path.suffix)
+            )
+            plan.update(confidence=confidence, candidate=candidate, target=str(target))
+            if (
+                confidence >= threshold
+                and target not in claimed
+                and not target.exists()
+            ):
+                plan["action"] = "rename"
+                claimed.add(target)
+        yield plan
+
+
+def apply_plan_entry(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Performs a "rename" entry. On failure the entry is turned into a "review" one.
+    """
+    if plan["action"] != "rename":
+        return plan
+    try:
+        move_to_completed(Path(plan["file_path"]), Path(plan["target"]).name)
+    except Exception as e:
+        logger.error(f"Error renaming/moving {plan['file_path']}: {e}")
+        plan["action"] = "review"
+        plan["error"] = f"{type(e).__name__}: {e}"
+    return plan
+
+
+def load_review_queue(queue_file: str) -> List[Path]:
+    """
+    Returns the files listed in a review queue that still exist.
+    """
+    paths = []
+    with open(queue_file, encoding="utf-8") as f:
+        for line in f:
+            try:
+                file_path = Path(json.loads(line)["file_path"])
+            except (json.JSONDecodeError, KeyError):
+                continue
+            if file_path.is_file():
+                paths.append(file_path)
+    return paths
+
+
+def run(
+    paths: Iterable[str],
+    plan_file: str,
+    review_file: str,
+    threshold: float = DEFAULT_THRESHOLD,
+    dry_run: bool = False,
+    **batch_options,
+) -> Dict[str, int]:
+    counts = {"rename": 0, "review": 0, "error": 0}
+    with (
+        open(plan_file, "w", encoding="utf-8") as plan_out,
+        open(review_file, "w", encoding="utf-8") as review_out,
+    ):
+        for plan in plan_renames(paths, threshold, **batch_options):
+            if not dry_run:
+                plan = apply_plan_entry(plan)
+            plan["dry_run"] = dry_run
+            counts[plan["action"]] += 1
+            line = json.dumps(plan, ensure_ascii=False) + "\n"
+            plan_out.write(line)
+            plan_out.flush()
+            if plan["action"] != "rename":
+                review_out.write(line)
+                review_out.flush()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Resolve a tree of PDF/EPUB files and rename confident matches "
+        "into completed/ folders; everything else goes to a review queue for the GUI."
+    )
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        help="PDF/EPUB files, directories or glob patterns; '-' reads paths from stdin.",
+    )
+    parser.add_argument(
+        "-r", "--recursive", action="store_true", help="Walk subdirectories."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Minimum confidence to rename automatically (default: {DEFAULT_THRESHOLD}).",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only write the rename plan; do not touch any file.",
+    )
+    parser.add_argument(
+        "--plan", default="rename_plan.jsonl", help="Where to write the full plan."
+    )
+    parser.add_argument(
+        "--review-queue",
+        default="review_queue.jsonl",
+        help="Where to write files that need a human decision.",
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=None, help="File parsing processes."
+    )
+    parser.add_argument(
+        "--lookup-workers",
+        type=int,
+        default=8,
+        help="Concurrent Google Books lookups (default: 8).",
+    )
+    parser.add_argument(
+        "--batch-isbn",
+        action="store_true",
+        help="Send ISBN lookups in batch HTTP requests.",
+    )
+    parser.add_argument(
+        "--strategy",
+        choices=STRATEGIES,
+        default=DEFAULT_STRATEGY,
+        help="'waterfall' tries one evidence source after the other; 'parallel' "
+        f"gathers all evidence and sends its queries at once (default: {DEFAULT_STRATEGY}).",
+    )
+    args = parser.parse_args()
+    configure()
+
+    counts = run(
+        iter_input_paths(args.paths, args.recursive),
+        args.plan,
+        args.review_queue,
+        threshold=args.threshold,
+        dry_run=args.dry_run,
+        parse_workers=args.workers,
+        lookup_workers=args.lookup_workers,
+        batch_isbn=args.batch_isbn,
+        strategy=args.strategy,
+    )
+    verb = "Would rename" if args.dry_run else "Renamed"
+    print(
+        f"{verb} {counts['rename']} files, {counts['review']} need review, "
+        f"{counts['error']} failed",
+        file=sys.stderr,
+    )
+    sys.exit(1 if counts["error"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,217 @@
 import argparse
+import glob
 import json
+import os
 import sys
-from .core import get_books_info_list
+from pathlib import Path
+from typing import Iterable, Iterator, Set
+
+from config import configure
+from core import (
+    DEFAULT_STRATEGY,
+    STRATEGIES,
+    get_books_info_list,
+    iter_books_info_batch,
+)
+from instrumentation import MemorySink, format_summary, get_recorder
+from utils import COMPLETED_DIR
+
+SUPPORTED_SUFFIXES = (".pdf", ".epub")
+
+
+def _iter_dir(path: Path, recursive: bool) -> Iterator[Path]:
+    if not recursive:
+        yield from path.iterdir()
+        return
+    for dirpath, dirnames, filenames in path.walk():
+        # Files autorename already moved into completed/ are not resolved again
+        dirnames[:] = [name for name in dirnames if name != COMPLETED_DIR]
+        for name in filenames:
+            yield dirpath / name
+
+
+def iter_input_paths(inputs: Iterable[str], recursive: bool) -> Iterator[str]:
+    """
+    Expands files, directories, glob patterns and "-" (paths read from stdin,
+    one per line) into a lazy stream of PDF/EPUB file paths. Recursive walks skip
+    the "completed" folders that hold files already renamed by autorename.
+    """
+    for item in inputs:
+        if item == "-":
+            for line in sys.stdin:
+                line = line.strip()
+                if line:
+                    yield from iter_input_paths([line], recursive)
+            continue
+        path = Path(item)
+        if path.is_dir():
+            for child in _iter_dir(path, recursive):
+                if child.is_file() and child.suffix.lower() in SUPPORTED_SUFFIXES:
+                    yield str(child)
+        elif path.is_file():
+            yield str(path)
+        elif glob.has_magic(item):
+            for match in glob.iglob(item, recursive=recursive):
+                yield from iter_input_paths([match], recursive)
+        else:
+            # Unknown paths are passed through and reported as invalid_file
+            yield item
+
+
+def load_done_paths(resume_file: str) -> Set[str]:
+    """
+    Returns the paths resolved without error in a previous JSON Lines output.
+    """
+    done = set()
+    if not os.path.exists(resume_file):
+        return done
+    with open(resume_file, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # e.g. a line cut off by an interrupted run
+            if not entry.get("file_path") or entry.get("error"):
+                continue
+            sources = {r.get("source") for r in entry.get("results") or []}
+            if "invalid_api_key" not in sources:
+                done.add(entry["file_path"])
+    return done
+
+
+def end_partial_line(path: str) -> None:
+    """
+    Terminates a last line cut off by an interrupted run, so lines appended to
+    the file start on a line of their own.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    done = load_done_paths(args.resume) if args.resume else set()
+    if done:
+        print(f"Resuming: skipping {len(done)} already resolved files", file=sys.stderr)
+
+    seen = set(done)
+
+    def pending_paths() -> Iterator[str]:
+        for path in iter_input_paths(args.paths, args.recursive):
+            if path not in seen:
+                seen.add(path)
+                yield path
+
+    appending = args.resume and args.output and Path(args.resume) == Path(args.output)
+    if appending:
+        end_partial_line(args.output)
+    out = (
+        open(args.output, "a" if appending else "w", encoding="utf-8")
+        if args.output
+        else sys.stdout
+    )
+    resolved = failed = 0
+    try:
+        for entry in iter_books_info_batch(
+            pending_paths(),
+            parse_workers=args.workers,
+            lookup_workers=args.lookup_workers,
+            batch_isbn=args.batch_isbn,
+            strategy=args.strategy,
+        ):
+            out.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            out.flush()
+            if entry["error"]:
+                failed += 1
+            else:
+                resolved += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Resolved {resolved} files, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
 
 
 def main():
     parser = argparse.ArgumentParser(description="Extract book metadata from PDF or EPUB files using Google Books API.")
-    parser.add_argument("file_path", help="Path to the PDF or EPUB file.")
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        help="PDF/EPUB files, directories or glob patterns; '-' reads paths from stdin.",
+    )
     # parser.add_argument("--api-key", required=True, help="Google Books API key.")
+    parser.add_argument(
+        "-r", "--recursive", action="store_true", help="Walk subdirectories."
+    )
+    parser.add_argument(
+        "--jsonl",
+        action="store_true",
+        help="Write one JSON line per file as it completes (implied by batch options).",
+    )
+    parser.add_argument(
+        "-o", "--output", help="Write JSON Lines here instead of stdout."
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="JSONL",
+        help="Skip files already resolved without error in this previous output. "
+        "When it is also the --output file, new lines are appended.",
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=None, help="File parsing processes."
+    )
+    parser.add_argument(
+        "--lookup-workers",
+        type=int,
+        default=8,
+        help="Concurrent Google Books lookups (default: 8).",
+    )
+    parser.add_argument(
+        "--batch-isbn",
+        action="store_true",
+        help="Send ISBN lookups in batch HTTP requests.",
+    )
+    parser.add_argument(
+        "--strategy",
+        choices=STRATEGIES,
+        default=DEFAULT_STRATEGY,
+        help="'waterfall' tries one evidence source after the other; 'parallel' "
+        f"gathers all evidence and sends its queries at once (default: {DEFAULT_STRATEGY}).",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print p50/p95 timings per stage, source and strategy to stderr at the end.",
+    )
     args = parser.parse_args()
+    configure()
+    profile = get_recorder().add_sink(MemorySink()) if args.profile else None
 
+    single_file = len(args.paths) == 1 and Path(args.paths[0]).is_file()
+    batch_mode = (
+        not single_file
+        or args.jsonl
+        or args.output
+        or args.resume
+        or args.recursive
+        or args.batch_isbn
+    )
     try:
-        result = get_books_info_list(args.file_path)
+        if batch_mode:
+            sys.exit(run_batch(args))
+        result = get_books_info_list(args.paths[0], strategy=args.strategy)
         print(json.dumps(result, indent=2, ensure_ascii=False))
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        if profile is not None:
+            print(format_summary(profile), file=sys.stderr)
 
 
 if __name__ == "__main__":
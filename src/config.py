@@ -0,0 +1,49 @@
+import logging
+import os
+from typing import Optional
+
+_settings_loaded = False
+_logging_configured = False
+
+
+def load_settings() -> None:
+    """
+    Loads variables from a .env file into the environment (once per process).
+    Variables already set in the environment win.
+    """
+    global _settings_loaded
+    if _settings_loaded:
+        return
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    _settings_loaded = True
+
+
+def configure_logging(level: int = logging.INFO) -> None:
+    """
+    Sets up log output for the command line tools and the GUI (once per process).
+    Library code only logs to the "bookinfo" logger and never calls this.
+    """
+    global _logging_configured
+    if _logging_configured:
+        return
+    logging.basicConfig(level=level)
+    logging.getLogger("googleapiclient.discovery_cache").setLevel(logging.WARNING)
+    _logging_configured = True
+
+
+def configure(level: int = logging.INFO) -> None:
+    """
+    One-time setup for entry points: environment settings, then logging.
+    """
+    load_settings()
+    configure_logging(level)
+
+
+def get_api_key() -> Optional[str]:
+    """
+    Returns the Google Books API key from GOOGLE_BOOKS_API_KEY (or the .env file).
+    """
+    load_settings()
+    return os.getenv("GOOGLE_BOOKS_API_KEY")
@@ -2,38 +2,75 @@ import os
 
 # import json
 import logging
-from typing import Optional, Dict, Any, List
+import threading
+from contextlib import nullcontext
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Dict, Any, List, Iterable, Iterator
 from utils import (
-    extract_isbns,
+    find_first_isbn,
+    normalize_title,
+    to_isbn13,
+    rank_isbns,
+    rank_title_lines,
     clean_title_from_filename,
     is_pdf,
     is_epub,
     validate_file_path,
     validate_api_key,
 )
-from tenacity import retry, stop_after_attempt, wait_exponential
-from dotenv import load_dotenv
 
 # import requests
-from PIL import Image
-
 # import io
-# PDF/EPUB imports
-import pypdf
-import pdfplumber
-from ebooklib import epub
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+# Heavy backends (pdfplumber, googleapiclient, tenacity, PIL) are imported by
+# these modules only when a code path needs them
+from config import get_api_key
+from errors import (
+    BookLookupError,
+    InvalidQueryError,
+    QuotaExceededError,
+    TransientLookupError,
+    classify_error,
+)
+from retry_policy import get_circuit_breaker, get_rate_limiter, lookup_retry
+from google_client import BATCH_SIZE, get_client
+from instrumentation import Timer, call_with_events, count, get_recorder, timer
+from local_index import get_local_index
+from ranking import ensure_ranked, rank_candidates
+from lookup_cache import get_lookup_cache, normalize_query
+from file_cache import FileResultCache, get_file_cache
+from pdf_document import PdfDocument
+from epub_reader import EpubReader
 
-load_dotenv()
+if TYPE_CHECKING:
+    from PIL import Image
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("bookinfo")
 
-logging.getLogger("pypdf").setLevel(logging.ERROR)
-logging.getLogger("googleapiclient.discovery_cache").setLevel(logging.WARNING)
-
-api_key = os.getenv("GOOGLE_BOOKS_API_KEY")
+# Validated ISBNs tried per evidence source, best-ranked first
+MAX_ISBN_QUERIES = 3
+# PDF pages searched for an ISBN: the front matter, then the last pages (back cover)
+TEXT_FRONT_PAGES = 5
+TEXT_BACK_PAGES = 2
+# Title-line probes sent per file when no ISBN is found (BOOKINFO_PROBE_BUDGET)
+DEFAULT_PROBE_BUDGET = 3
+# A probe answer is accepted at once when its title is at least this similar
+PROBE_MIN_SIMILARITY = 0.6
+PROBE_WORKERS = 8
+# How resolve_books_info turns evidence into queries: the "waterfall" tries one
+# source after the other, "parallel" sends every promising query at once
+STRATEGIES = ("waterfall", "parallel")
+DEFAULT_STRATEGY = "waterfall"
+# Queries sent at once per file by the parallel strategy
+MAX_PARALLEL_QUERIES = 8
+MAX_RESULTS = 10
 
 OUTPUT_FIELDS = [
     "isbn_10",
@@ -58,74 +95,193 @@ def default_output(source: str) -> Dict[str, Any]:
     }
 
 
-def extract_metadata_from_pdf(file_path: str) -> Dict[str, Any]:
+def _open_pdf(file_path: str, document: Optional[PdfDocument]):
+    """
+    Returns a context manager yielding ``document`` unchanged (the caller owns it)
+    or a PdfDocument opened just for this call.
+    """
+    if document is not None:
+        return nullcontext(document)
+    return PdfDocument(file_path)
+
+
+def extract_metadata_from_pdf(
+    file_path: str, document: Optional[PdfDocument] = None
+) -> Dict[str, Any]:
     try:
-        with open(file_path, "rb") as f:
-            reader = pypdf.PdfReader(f)
-            info = reader.metadata
-            meta = {}
-            if info:
-                meta["title"] = info.title if info.title else None
-                meta["author"] = info.author if info.author else None
-            return meta
+        with _open_pdf(file_path, document) as doc:
+            return doc.metadata
     except Exception as e:
         logger.warning(f"Failed to extract PDF metadata: {e}")
         return {}
 
 
-def extract_metadata_from_epub(file_path: str) -> Dict[str, Any]:
+def _open_epub(file_path: str, reader: Optional[EpubReader]):
+    if reader is not None:
+        return nullcontext(reader)
+    return EpubReader(file_path)
+
+
+def extract_metadata_from_epub(
+    file_path: str, reader: Optional[EpubReader] = None
+) -> Dict[str, Any]:
     try:
-        book = epub.read_epub(file_path)
-        meta = {}
-        # ISBN
-        identifiers = book.get_metadata("DC", "identifier")
-        for id_tuple in identifiers:
-            val = id_tuple[0]
-            if val and (len(val) == 10 or len(val) == 13):
-                meta["isbn"] = val
-        # Title
-        titles = book.get_metadata("DC", "title")
-        if titles:
-            meta["title"] = titles[0][0]
-        # Author
-        creators = book.get_metadata("DC", "creator")
-        if creators:
-            meta["author"] = creators[0][0]
-        return meta
+        with _open_epub(file_path, reader) as book:
+            return book.metadata
     except Exception as e:
         logger.warning(f"Failed to extract EPUB metadata: {e}")
         return {}
 
 
-def extract_text_from_pdf(file_path: str, max_pages: int = 5) -> str:
-    text = ""
+def iter_pdf_page_texts(
+    file_path: str,
+    front_pages: int = TEXT_FRONT_PAGES,
+    back_pages: int = TEXT_BACK_PAGES,
+    document: Optional[PdfDocument] = None,
+    page_breaks: bool = False,
+) -> Iterator[str]:
+    """
+    Yields page texts lazily, the first ``front_pages`` pages and then the last
+    ``back_pages`` pages. Pages the caller does not ask for are never extracted.
+    With ``page_breaks`` each page starts with its separator from the previous
+    one (see PdfDocument.iter_text_chunks), so the texts can be scanned as a stream.
+    """
     try:
-        with pdfplumber.open(file_path) as pdf:
-            for i, page in enumerate(pdf.pages):
-                if i >= max_pages:
-                    break
-                text += page.extract_text() or ""
+        with _open_pdf(file_path, document) as doc:
+            if page_breaks:
+                yield from doc.iter_text_chunks(front_pages, back_pages)
+            else:
+                yield from doc.iter_page_texts(front_pages, back_pages)
     except Exception as e:
         logger.warning(f"Failed to extract text from PDF: {e}")
-    return text
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=2, min=2, max=10))
-def query_google_books_api(
-    query: str, api_key: str = api_key
-) -> Optional[List[Dict[str, Any]]]:
+def extract_title_lines_from_pdf(
+    file_path: str, document: Optional[PdfDocument] = None
+) -> List[str]:
+    """
+    Returns the lines of the first page most likely to be the title, best first.
+    """
     try:
-        service = build("books", "v1", developerKey=api_key)
-        request = service.volumes().list(q=query, maxResults=5)
-        response = request.execute()
-        items = response.get("items", [])
+        with _open_pdf(file_path, document) as doc:
+            if not doc.page_count:
+                return []
+            return rank_title_lines(doc.title_lines(0))
+    except Exception as e:
+        logger.warning(f"Failed to extract title lines from PDF: {e}")
+        return []
+
+
+def extract_text_from_pdf(
+    file_path: str, max_pages: int = 5, document: Optional[PdfDocument] = None
+) -> str:
+    return "".join(
+        iter_pdf_page_texts(file_path, max_pages, back_pages=0, document=document)
+    )
+
+
+def query_google_books_api(
+    query: str, api_key: Optional[str] = None, use_cache: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Returns the Google Books items for the query, served from the persistent
+    lookup cache or the local book index when possible. A query Google rejects as
+    invalid yields no items; any other failure raises a BookLookupError (see
+    errors.py) and is not cached. Books fetched from Google are added to the index.
+    """
+    items = lookup_cached(query, use_cache)
+    if items is not None:
         return items
-    except HttpError as e:
-        logger.error(f"Google Books API error: {e}")
+    return fetch_and_store(query, api_key, use_cache)
+
+
+def _query_kind(query: str) -> str:
+    return "isbn" if query.startswith("isbn:") else "title"
+
+
+def lookup_cached(query: str, use_cache: bool = True) -> Optional[List[Dict[str, Any]]]:
+    """
+    The items for the query from the lookup cache or the local book index, or None
+    when the network has to be asked. Cached empty answers come after the index.
+    """
+    if not use_cache:
         return None
+    kind = _query_kind(query)
+    cache = get_lookup_cache()
+    cached = cache.get(query) if cache is not None else None
+    if cached:
+        logger.info(f"Lookup cache hit: {query}")
+        count("lookup_cache", result="hit", kind=kind)
+        return cached
+    index = get_local_index()
+    if index is not None:
+        # Also asked when Google had nothing: imported dumps may know the book
+        with timer("local_index", kind=kind):
+            items = index.lookup(query)
+        if items is not None:
+            logger.info(f"Local index hit: {query}")
+            count("local_index", result="hit", kind=kind)
+            return items
+    if cached is not None:
+        logger.info(f"Lookup cache hit: {query}")
+        count("lookup_cache", result="negative_hit", kind=kind)
+        return cached
+    count("lookup_cache", result="miss", kind=kind)
+    return None
+
+
+def fetch_and_store(
+    query: str, api_key: Optional[str] = None, use_cache: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Fetches the query from Google Books and stores the answer in the lookup cache
+    and the local book index. A query Google rejects as invalid yields no items.
+    """
+    try:
+        # Includes retries, rate limiting and circuit breaker pauses
+        with timer("google_api", kind=_query_kind(query)):
+            items = fetch_google_books_api(query, api_key or get_api_key())
+    except InvalidQueryError as e:
+        logger.warning(f"Google Books rejected query {query!r}: {e}")
+        return []
+    cache = get_lookup_cache() if use_cache else None
+    if cache is not None:
+        cache.set(query, items)
+    index = get_local_index()
+    if index is not None:
+        index.add_items(items)
+    return items
+
+
+@lookup_retry
+def fetch_google_books_api(query: str, api_key: str) -> List[Dict[str, Any]]:
+    """
+    Queries Google Books over the network, bypassing the lookup cache.
+
+    Transient failures (429, 5xx, network) are retried with jittered backoff;
+    anything else is raised at once as a classified BookLookupError. All calls go
+    through the shared circuit breaker, which pauses every worker after repeated
+    failures and stops lookups once the quota is exhausted, and every attempt
+    takes a token from the shared rate limiter.
+    """
+    breaker = get_circuit_breaker()
+    breaker.before_call()
+    limiter = get_rate_limiter()
+    if limiter is not None:
+        limiter.acquire()
+    try:
+        with timer("google_request"):
+            items = get_client(api_key).list_volumes(query, max_results=5)
     except Exception as e:
-        logger.error(f"Unexpected error querying Google Books API: {e}")
-        return None
+        error = classify_error(e)
+        count("google_errors", error=type(error).__name__)
+        breaker.record_failure(error)
+        if not isinstance(error, TransientLookupError):
+            # Transient failures are logged by the retry policy
+            logger.error(f"Google Books API error for {query!r}: {error}")
+        raise error from e
+    breaker.record_success()
+    return items
 
 
 def parse_google_books_item(item: Dict[str, Any]) -> Dict[str, Any]:
@@ -156,113 +312,911 @@ def parse_google_books_item(item: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def get_books_info_list(file_path: str, api_key: str = api_key) -> List[Dict[str, Any]]:
+def _ranked_isbns(text: str) -> List[str]:
+    return rank_isbns(text)[:MAX_ISBN_QUERIES]
+
+
+def collect_file_evidence(
+    file_path: str,
+    document: PdfDocument | EpubReader | None = None,
+    exhaustive: bool = False,
+) -> Dict[str, Any]:
     """
-    Returns a list of up to 10 matching book info dicts if ISBN is found, otherwise a single best match as before.
+    Extracts the local evidence used to look a file up: filename ISBNs, embedded
+    metadata and PDF text. Stages are only run as far as the lookup chain needs them,
+    so a file with an ISBN in its name is never opened, PDF text is read page by page
+    until an ISBN turns up, and a file is parsed at most once. Pass an open
+    ``document`` (see open_document) to share the parse with other callers.
+
+    With ``exhaustive`` every stage runs, in one pass over the file, for the
+    "parallel" strategy (see resolve_books_info).
     """
-    if not validate_file_path(file_path):
-        logger.error(f"Invalid file path or unsupported file type: {file_path}")
-        return [default_output(source="invalid_file")]
-    if not validate_api_key(api_key):
-        logger.error("Invalid or missing Google Books API key.")
-        return [default_output(source="invalid_api_key")]
+    if document is None:
+        document = open_document(file_path)
+        if document is not None:
+            with document:
+                return collect_file_evidence(file_path, document, exhaustive)
 
     filename = os.path.basename(file_path)
-    isbn10s, isbn13s = extract_isbns(filename)
-    if isbn13s or isbn10s:
-        isbn = isbn13s[0] if isbn13s else isbn10s[0]
-        logger.info(f"Found ISBN in filename: {isbn}")
-        items = query_google_books_api(f"isbn:{isbn}", api_key)
-        if items:
-            results = []
-            for item in items[:10]:
-                result = parse_google_books_item(item)
-                result["source"] = "isbn_filename"
-                results.append(result)
-            return results
-        else:
-            return [default_output(source="isbn_filename")]
+    evidence = {
+        "filename": filename,
+        "filename_isbns": _ranked_isbns(filename),
+        "metadata": {},
+        "metadata_isbns": [],
+        "filename_title": None,
+        "text": None,
+        "text_isbns": [],
+        "title_lines": [],
+    }
+    if exhaustive:
+        evidence["exhaustive"] = True
+    if evidence["filename_isbns"]:
+        logger.info(f"Found ISBN in filename: {evidence['filename_isbns'][0]}")
+        if not exhaustive:
+            return evidence
 
     meta = {}
     if is_pdf(file_path):
-        meta = extract_metadata_from_pdf(file_path)
+        with timer("metadata", format="pdf"):
+            meta = extract_metadata_from_pdf(file_path, document)
     elif is_epub(file_path):
-        meta = extract_metadata_from_epub(file_path)
+        with timer("metadata", format="epub"):
+            meta = extract_metadata_from_epub(file_path, document)
+    evidence["metadata"] = meta
     meta_text = " ".join(str(v) for v in meta.values() if v)
-    isbn10s, isbn13s = extract_isbns(meta_text)
-    if isbn13s or isbn10s:
-        isbn = isbn13s[0] if isbn13s else isbn10s[0]
-        logger.info(f"Found ISBN in file metadata: {isbn}")
-        items = query_google_books_api(f"isbn:{isbn}", api_key)
-        if items:
-            results = []
-            for item in items[:10]:
-                result = parse_google_books_item(item)
-                result["source"] = "file_metadata"
-                results.append(result)
+    evidence["metadata_isbns"] = _ranked_isbns(meta_text)
+    if evidence["metadata_isbns"]:
+        logger.info(f"Found ISBN in file metadata: {evidence['metadata_isbns'][0]}")
+        if not exhaustive:
+            return evidence
+    if meta.get("title") and not exhaustive:
+        return evidence
+
+    evidence["filename_title"] = clean_title_from_filename(filename)
+    if evidence["filename_title"]:
+        logger.info(f"Using cleaned filename as title: {evidence['filename_title']}")
+        if not exhaustive:
+            return evidence
+
+    if is_pdf(file_path):
+        # Stop reading once a valid ISBN is complete; usually one or two pages
+        pages = []
+
+        def read_pages() -> Iterator[str]:
+            for page_text in iter_pdf_page_texts(
+                file_path, document=document, page_breaks=True
+            ):
+                pages.append(page_text)
+                yield page_text
+
+        with timer("pdf_text"):
+            find_first_isbn(read_pages())
+        count("pdf_pages_read", len(pages))
+        text = "".join(pages)
+        evidence["text"] = text
+        evidence["text_isbns"] = _ranked_isbns(text)
+        if evidence["text_isbns"]:
+            logger.info(f"Found ISBN in PDF text: {evidence['text_isbns'][0]}")
+        if exhaustive or not evidence["text_isbns"]:
+            with timer("title_lines"):
+                evidence["title_lines"] = extract_title_lines_from_pdf(
+                    file_path, document
+                )
+    return evidence
+
+
+def _isbn_steps(isbns: List[str], source: str) -> List[Dict[str, Any]]:
+    return [
+        {
+            "query": f"isbn:{isbn}",
+            "source": source,
+            "kind": "isbn",
+            "fallthrough": i < len(isbns) - 1,
+        }
+        for i, isbn in enumerate(isbns)
+    ]
+
+
+def default_probe_budget() -> int:
+    """
+    Number of title-line probes sent per file, from BOOKINFO_PROBE_BUDGET.
+    """
+    try:
+        return max(0, int(os.getenv("BOOKINFO_PROBE_BUDGET", DEFAULT_PROBE_BUDGET)))
+    except ValueError:
+        return DEFAULT_PROBE_BUDGET
+
+
+def plan_queries(
+    evidence: Dict[str, Any], probe_budget: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Turns collected evidence into the ordered Google Books queries to try.
+
+    Each step has a ``kind``: "isbn" and "title" steps return every item found
+    and end the chain even when nothing is found.
+    "probe" steps (likely title lines of the PDF, at most ``probe_budget``) fall
+    through to the next step when empty, as do ISBN steps marked ``fallthrough``
+    when a lower-ranked ISBN is still to be tried.
+    """
+    for key, source in (
+        ("filename_isbns", "isbn_filename"),
+        ("metadata_isbns", "file_metadata"),
+    ):
+        if evidence.get(key):
+            return _isbn_steps(evidence[key], source)
+
+    meta = evidence.get("metadata") or {}
+    if meta.get("title"):
+        query = meta["title"]
+        if meta.get("author"):
+            query += f" {meta['author']}"
+        return [{"query": query, "source": "file_metadata", "kind": "title"}]
+
+    if evidence.get("filename_title"):
+        return [
+            {
+                "query": evidence["filename_title"],
+                "source": "filename_title",
+                "kind": "title",
+            }
+        ]
+
+    if evidence.get("text_isbns"):
+        return _isbn_steps(evidence["text_isbns"], "pdf_text")
+    lines = evidence.get("title_lines")
+    if not lines:
+        # Evidence cached before title lines were collected, or a page without
+        # usable font information: fall back to the first digit-free text lines
+        lines = [
+            line.strip()
+            for line in (evidence.get("text") or "").splitlines()[:20]
+            if len(line.strip()) > 5 and not any(c.isdigit() for c in line)
+        ]
+    if probe_budget is None:
+        probe_budget = default_probe_budget()
+    return [
+        {"query": line, "source": "pdf_text", "kind": "probe"}
+        for line in lines[:probe_budget]
+    ]
+
+
+def fallback_source(evidence: Dict[str, Any]) -> str:
+    return "pdf_text" if evidence.get("text") is not None else "not_found"
+
+
+def results_from_items(
+    step: Dict[str, Any], items: Optional[List[Dict[str, Any]]]
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Converts the API items for a planned step into output dicts, in Google's
+    order (see ranking.rank_candidates for the final order). Returns None when a
+    fall-through step found nothing and the chain should continue.
+    """
+    if not items:
+        if step["kind"] == "probe" or step.get("fallthrough"):
+            return None
+        return [default_output(source=step["source"])]
+    results = []
+    for item in items[:10]:
+        result = parse_google_books_item(item)
+        result["source"] = step["source"]
+        results.append(result)
+    return results
+
+
+def probe_matches(step: Dict[str, Any], items: Optional[List[Dict[str, Any]]]) -> bool:
+    """
+    True when the top item for a title-line probe has a title close to the line.
+    """
+    if not items:
+        return False
+    info = items[0].get("volumeInfo", {})
+    title = info.get("title") or ""
+    query = normalize_title(step["query"])
+    for candidate in (title, f"{title} {info.get('subtitle') or ''}"):
+        candidate = normalize_title(candidate)
+        if len(candidate) > 5 and candidate in query:
+            return True
+        if SequenceMatcher(None, query, candidate).ratio() >= PROBE_MIN_SIMILARITY:
+            return True
+    return False
+
+
+_probe_executor: Optional[ThreadPoolExecutor] = None
+_probe_executor_lock = threading.Lock()
+
+
+def _get_probe_executor() -> ThreadPoolExecutor:
+    global _probe_executor
+    if _probe_executor is None:
+        with _probe_executor_lock:
+            if _probe_executor is None:
+                _probe_executor = ThreadPoolExecutor(
+                    max_workers=PROBE_WORKERS, thread_name_prefix="probe"
+                )
+    return _probe_executor
+
+
+def run_probe_steps(
+    steps: List[Dict[str, Any]],
+    api_key: Optional[str] = None,
+    use_cache: bool = True,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Sends the title-line probes concurrently and returns the results of the first
+    one that answers with a matching title; probes not yet started are cancelled.
+    Without such a match, the best-ranked probe that found anything wins.
+    Returns None when every probe came back empty.
+    """
+    executor = _get_probe_executor()
+    futures = {}
+    for i, step in enumerate(steps):
+        logger.info(f"Trying line as title from PDF text: {step['query']}")
+        future = executor.submit(query_step, step, api_key, DEFAULT_STRATEGY, use_cache)
+        futures[future] = i
+    answers = {}
+    try:
+        for future in as_completed(futures):
+            i = futures[future]
+            answers[i] = future.result()
+            if probe_matches(steps[i], answers[i]):
+                return results_from_items(steps[i], answers[i])
+    finally:
+        for future in futures:
+            future.cancel()
+    return select_probe_answer(steps, answers)
+
+
+def select_probe_answer(
+    steps: List[Dict[str, Any]], answers: Dict[int, List[Dict[str, Any]]]
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Without a matching probe, the results of the best-ranked probe (by index in
+    ``steps``) that found anything, or None.
+    """
+    for i, step in enumerate(steps):
+        results = results_from_items(step, answers.get(i))
+        if results is not None:
             return results
+    return None
+
+
+def step_timer(step: Dict[str, Any], strategy: str = DEFAULT_STRATEGY) -> Timer:
+    """
+    Times the lookup of a planned step per source and strategy; set its "found"
+    label once the items are known.
+    """
+    return timer("lookup", source=step["source"], kind=step["kind"], strategy=strategy)
+
+
+def query_step(
+    step: Dict[str, Any],
+    api_key: Optional[str] = None,
+    strategy: str = DEFAULT_STRATEGY,
+    use_cache: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    query_google_books_api for a planned step, timed per source and strategy.
+    """
+    with step_timer(step, strategy) as t:
+        items = query_google_books_api(step["query"], api_key, use_cache)
+        t.labels["found"] = bool(items)
+    return items
+
+
+def check_strategy(strategy: str) -> str:
+    if strategy not in STRATEGIES:
+        raise ValueError(
+            f"Unknown strategy {strategy!r}, expected one of {', '.join(STRATEGIES)}"
+        )
+    return strategy
+
+
+def resolve_books_info(
+    evidence: Dict[str, Any],
+    api_key: Optional[str] = None,
+    strategy: str = DEFAULT_STRATEGY,
+    executor: Optional[ThreadPoolExecutor] = None,
+    use_cache: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Runs the Google Books queries for the evidence and returns the answer ranked
+    against the evidence, each result with a "confidence" (see ranking.py).
+
+    The "waterfall" strategy runs the planned queries one after the other (see
+    plan_queries); "parallel" sends them all at once and merges the answers (see
+    resolve_parallel), which wants evidence collected with ``exhaustive``.
+    ``executor`` runs the queries of the parallel strategy. With ``use_cache``
+    off, the lookup cache and the local index are not read (see
+    query_google_books_api).
+    """
+    with timer("resolve", strategy=check_strategy(strategy)) as t:
+        if strategy == "parallel":
+            results = resolve_parallel(evidence, api_key, executor, use_cache)
         else:
-            return [default_output(source="file_metadata")]
+            results = _resolve_candidates(evidence, api_key, use_cache)
+        results = rank_answer(results, evidence, strategy)
+        t.labels["source"] = results[0]["source"]
+    return results
+
+
+def rank_answer(
+    results: List[Dict[str, Any]], evidence: Dict[str, Any], strategy: str
+) -> List[Dict[str, Any]]:
+    with timer("ranking", strategy=strategy):
+        return rank_candidates(results, evidence)
+
+
+def not_found(evidence: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    The placeholder answer when no lookup found anything.
+    """
+    source = fallback_source(evidence)
+    if source == "not_found":
+        logger.info("No metadata found for file.")
+    return [default_output(source=source)]
+
+
+def split_probes(steps: List[Dict[str, Any]]) -> tuple:
+    """
+    Splits planned steps into those run one after the other and the title-line
+    probes, which are sent together once those found nothing.
+    """
+    return (
+        [step for step in steps if step["kind"] != "probe"],
+        [step for step in steps if step["kind"] == "probe"],
+    )
+
+
+def _resolve_candidates(
+    evidence: Dict[str, Any], api_key: Optional[str] = None, use_cache: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Runs the planned queries in order; title-line probes are sent together
+    (see run_probe_steps).
+    """
+    steps, probes = split_probes(plan_queries(evidence))
+    for step in steps:
+        logger.info(f"Querying Google Books ({step['source']}): {step['query']}")
+        results = results_from_items(
+            step, query_step(step, api_key, DEFAULT_STRATEGY, use_cache)
+        )
+        if results is not None:
+            return results
+    if probes:
+        results = run_probe_steps(probes, api_key, use_cache)
+        if results is not None:
+            return results
+    return not_found(evidence)
+
+
+def plan_parallel_queries(
+    evidence: Dict[str, Any], probe_budget: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Every promising query for the evidence, most trusted source first: the ISBNs
+    from the filename, metadata and PDF text, the embedded title, the cleaned
+    filename and the likely title lines. Repeated queries (the same ISBN in
+    several places) are sent once, and at most MAX_PARALLEL_QUERIES in total.
+    """
+    steps = []
+    isbns = set()
+    for key, source in (
+        ("filename_isbns", "isbn_filename"),
+        ("metadata_isbns", "file_metadata"),
+        ("text_isbns", "pdf_text"),
+    ):
+        for isbn in evidence.get(key) or []:
+            if to_isbn13(isbn) not in isbns:
+                isbns.add(to_isbn13(isbn))
+                steps.extend(_isbn_steps([isbn], source))
+    meta = evidence.get("metadata") or {}
     if meta.get("title"):
         query = meta["title"]
         if meta.get("author"):
             query += f" {meta['author']}"
-        logger.info(f"Searching Google Books API with metadata title/author: {query}")
-        items = query_google_books_api(query, api_key)
-        if items:
-            result = parse_google_books_item(items[0])
-            result["source"] = "file_metadata"
-            return [result]
+        steps.append({"query": query, "source": "file_metadata", "kind": "title"})
+    if evidence.get("filename_title"):
+        steps.append(
+            {
+                "query": evidence["filename_title"],
+                "source": "filename_title",
+                "kind": "title",
+            }
+        )
+    steps.extend(
+        step
+        for step in plan_queries(
+            {"text": evidence.get("text"), "title_lines": evidence.get("title_lines")},
+            probe_budget,
+        )
+        if step["kind"] == "probe"
+    )
+    unique = {}
+    for step in steps:
+        unique.setdefault(normalize_query(step["query"]), step)
+    return list(unique.values())[:MAX_PARALLEL_QUERIES]
+
+
+def _result_key(result: Dict[str, Any], item: Dict[str, Any]) -> str:
+    """
+    Identity of a volume across queries: its ISBN-13 (also derived from an
+    ISBN-10), otherwise its Google volume id.
+    """
+    for isbn in (result.get("isbn_13"), result.get("isbn_10")):
+        isbn13 = to_isbn13(isbn) if isbn else None
+        if isbn13:
+            return isbn13
+    return f"id:{item.get('id') or result.get('title')}"
+
+
+_parallel_executor: Optional[ThreadPoolExecutor] = None
+_parallel_executor_lock = threading.Lock()
+
+
+def _get_parallel_executor() -> ThreadPoolExecutor:
+    global _parallel_executor
+    if _parallel_executor is None:
+        with _parallel_executor_lock:
+            if _parallel_executor is None:
+                _parallel_executor = ThreadPoolExecutor(
+                    max_workers=MAX_PARALLEL_QUERIES, thread_name_prefix="parallel"
+                )
+    return _parallel_executor
+
+
+def resolve_parallel(
+    evidence: Dict[str, Any],
+    api_key: Optional[str] = None,
+    executor: Optional[ThreadPoolExecutor] = None,
+    use_cache: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Sends every query of plan_parallel_queries concurrently, so a file costs the
+    slowest single lookup instead of the whole chain, and merges the volumes
+    found by several queries into one result (see merge_parallel_answers).
+
+    Queries run on ``executor``, by default a pool of MAX_PARALLEL_QUERIES threads
+    kept apart from the title-line probes. Batch runs pass a pool sized for all
+    of their lookup workers.
+    """
+    steps = plan_parallel_queries(evidence)
+    executor = executor or _get_parallel_executor()
+    futures = []
+    for step in steps:
+        logger.info(f"Querying Google Books ({step['source']}): {step['query']}")
+        futures.append(
+            executor.submit(query_step, step, api_key, "parallel", use_cache)
+        )
+    outcomes = []
+    for future in futures:
+        try:
+            outcomes.append(future.result())
+        except BookLookupError as e:
+            outcomes.append(e)
+    return merge_parallel_answers(evidence, steps, outcomes)
+
+
+def merge_parallel_answers(
+    evidence: Dict[str, Any], steps: List[Dict[str, Any]], outcomes: List[Any]
+) -> List[Dict[str, Any]]:
+    """
+    Merges the items (or BookLookupError) each step of plan_parallel_queries got
+    into one answer: a volume found by several queries keeps the source of the
+    most trusted one. Failed lookups are skipped; when all of them failed the
+    first error is raised.
+    """
+    answers = []
+    errors = []
+    for step, outcome in zip(steps, outcomes):
+        if isinstance(outcome, BookLookupError):
+            logger.warning(f"Lookup failed for {step['query']!r}: {outcome}")
+            errors.append(outcome)
+        elif isinstance(outcome, BaseException):
+            raise outcome
         else:
-            return [default_output(source="file_metadata")]
-
-    title = clean_title_from_filename(filename)
-    if title:
-        logger.info(f"Using cleaned filename as title: {title}")
-        items = query_google_books_api(title, api_key)
-        if items:
-            result = parse_google_books_item(items[0])
-            result["source"] = "filename_title"
-            return [result]
+            answers.append((step, outcome))
+    if errors and len(errors) == len(steps):
+        raise errors[0]
+
+    merged: Dict[str, Dict[str, Any]] = {}
+    for step, items in answers:
+        for item in items or []:
+            result = parse_google_books_item(item)
+            result["source"] = step["source"]
+            merged.setdefault(_result_key(result, item), result)
+    if merged:
+        return list(merged.values())[:MAX_RESULTS]
+    return not_found(evidence)
+
+
+def _renamed_evidence(
+    evidence: Dict[str, Any], file_path: str
+) -> Optional[Dict[str, Any]]:
+    """
+    The cached evidence of a renamed file with its filename evidence re-derived
+    from the new name, or None when the new name yields other ISBNs or another
+    title: the stages that ran depended on the old name, so the file is parsed again.
+    """
+    filename = os.path.basename(file_path)
+    if _ranked_isbns(filename) != (evidence.get("filename_isbns") or []):
+        return None
+    title = evidence.get("filename_title")
+    if title is not None and clean_title_from_filename(filename) != title:
+        return None
+    return dict(evidence, filename=filename)
+
+
+def cached_file_results(
+    cache: FileResultCache, file_path: str, strategy: str
+) -> Optional[tuple]:
+    """
+    Returns (results, evidence) from the file result cache when its entry can
+    answer for the strategy, otherwise None. The parallel strategy does not reuse
+    answers found from the partial waterfall evidence. An entry found under the
+    file's old name is reused, and stored under the new one, only when the new
+    name yields the same filename evidence.
+    """
+    cached = cache.get(file_path)
+    if cached is not None and cached.get("renamed_from"):
+        evidence = _renamed_evidence(cached["evidence"], file_path)
+        if evidence is None:
+            logger.info(f"Filename evidence changed with the rename: {file_path}")
+            cached = None
         else:
-            return [default_output(source="filename_title")]
+            # Rank again: the filename is part of the evidence ranked against
+            cached = {
+                "results": rank_candidates(cached["results"], evidence),
+                "evidence": evidence,
+            }
+            cache.set(file_path, cached["results"], evidence)
+    if cached is None or (
+        strategy == "parallel" and not (cached["evidence"] or {}).get("exhaustive")
+    ):
+        count("file_cache", result="miss")
+        return None
+    logger.info(f"File cache hit: {file_path}")
+    count("file_cache", result="hit")
+    return ensure_ranked(cached["results"], cached["evidence"]), cached["evidence"]
+
+
+def early_answer(
+    file_path: str,
+    api_key: Optional[str],
+    cache: Optional[FileResultCache],
+    strategy: str,
+) -> Optional[tuple]:
+    """
+    Answers a file that needs no parsing: an invalid path or API key gets a
+    placeholder, a file in the result cache its cached answer (see
+    cached_file_results). Returns (results, evidence or None), otherwise None.
+    """
+    if not validate_file_path(file_path):
+        logger.error(f"Invalid file path or unsupported file type: {file_path}")
+        return [default_output(source="invalid_file")], None
+    if not validate_api_key(api_key):
+        logger.error("Invalid or missing Google Books API key.")
+        return [default_output(source="invalid_api_key")], None
+    if cache is not None:
+        return cached_file_results(cache, file_path, strategy)
+    return None
+
+
+def get_books_info_list(
+    file_path: str,
+    api_key: Optional[str] = None,
+    use_cache: bool = True,
+    document: PdfDocument | EpubReader | None = None,
+    strategy: str = DEFAULT_STRATEGY,
+) -> List[Dict[str, Any]]:
+    """
+    Returns the matching book info dicts, best first, each with a "confidence".
+    Unchanged (or merely renamed) files are answered from the file result cache;
+    ``use_cache`` off skips it as well as the lookup cache and the local index.
+    A document from open_document can be passed to share one parse with the cover.
+    ``api_key`` defaults to config.get_api_key(); see resolve_books_info for
+    ``strategy``.
+    """
+    check_strategy(strategy)
+    with timer("get_books_info_list", strategy=strategy) as t:
+        results = _get_books_info_list(
+            file_path, api_key or get_api_key(), use_cache, document, strategy
+        )
+        t.labels["source"] = results[0]["source"] if results else None
+    return results
+
+
+def _get_books_info_list(
+    file_path: str,
+    api_key: Optional[str],
+    use_cache: bool,
+    document: PdfDocument | EpubReader | None,
+    strategy: str,
+) -> List[Dict[str, Any]]:
+    cache = get_file_cache() if use_cache else None
+    answer = early_answer(file_path, api_key, cache, strategy)
+    if answer is not None:
+        return answer[0]
+
+    with timer("evidence", strategy=strategy):
+        evidence = collect_file_evidence(
+            file_path, document, exhaustive=strategy == "parallel"
+        )
+    results = resolve_books_info(evidence, api_key, strategy, use_cache=use_cache)
+    if cache is not None:
+        cache.set(file_path, results, evidence)
+    return results
+
+
+def prefetch_isbn_queries(queries: List[str], api_key: Optional[str] = None) -> int:
+    """
+    Warms the lookup cache for many "isbn:" queries using batch HTTP requests,
+    BATCH_SIZE queries per round trip. Queries that fail inside a batch are left
+    uncached so the regular per-query path retries them. Prefetching stops early
+    when the circuit breaker reports an exhausted quota.
+    Returns the number of queries sent to the network.
+    """
+    cache = get_lookup_cache()
+    if cache is None:
+        return 0
+    api_key = api_key or get_api_key()
+    breaker = get_circuit_breaker()
+    index = get_local_index()
+    todo = list(
+        dict.fromkeys(
+            q
+            for q in queries
+            if cache.get(q) is None and (index is None or index.lookup(q) is None)
+        )
+    )
+    sent = 0
+    for i in range(0, len(todo), BATCH_SIZE):
+        chunk = todo[i : i + BATCH_SIZE]
+        logger.info(f"Batch querying Google Books for {len(chunk)} ISBNs")
+        try:
+            breaker.before_call()
+            limiter = get_rate_limiter()
+            if limiter is not None:
+                # Google counts every query of a batch against the quota
+                limiter.acquire(len(chunk))
+            sent += len(chunk)
+            count("batch_queries", len(chunk))
+            with timer("google_batch"):
+                results = get_client(api_key).list_volumes_batch(chunk)
+        except QuotaExceededError as e:
+            logger.warning(f"Batch lookup stopped: {e}")
+            return sent
+        except Exception as e:
+            error = classify_error(e)
+            breaker.record_failure(error)
+            logger.warning(
+                f"Batch lookup failed, falling back to single queries: {error}"
+            )
+            if isinstance(error, QuotaExceededError):
+                return sent
+            continue
+        breaker.record_success()
+        for query, items in results.items():
+            if isinstance(items, Exception):
+                error = classify_error(items)
+                breaker.record_failure(error)
+                logger.warning(f"Batched query {query} failed: {error}")
+                continue
+            cache.set(query, items)
+            if index is not None:
+                index.add_items(items)
+    return sent
+
+
+def _plan(evidence: Dict[str, Any], strategy: str) -> List[Dict[str, Any]]:
+    if strategy == "parallel":
+        return plan_parallel_queries(evidence)
+    return plan_queries(evidence)
 
-    if is_pdf(file_path):
-        text = extract_text_from_pdf(file_path)
-        isbn10s, isbn13s = extract_isbns(text)
-        if isbn13s or isbn10s:
-            isbn = isbn13s[0] if isbn13s else isbn10s[0]
-            logger.info(f"Found ISBN in PDF text: {isbn}")
-            items = query_google_books_api(f"isbn:{isbn}", api_key)
-            if items:
-                results = []
-                for item in items[:10]:
-                    result = parse_google_books_item(item)
-                    result["source"] = "pdf_text"
-                    results.append(result)
-                return results
-            else:
-                return [default_output(source="pdf_text")]
-        lines = text.splitlines()
-        for line in lines[:20]:
-            if len(line.strip()) > 5 and not any(c.isdigit() for c in line):
-                logger.info(f"Trying line as title from PDF text: {line.strip()}")
-                items = query_google_books_api(line.strip(), api_key)
-                if items:
-                    result = parse_google_books_item(items[0])
-                    result["source"] = "pdf_text"
-                    return [result]
-        return [default_output(source="pdf_text")]
 
-    logger.info("No metadata found for file.")
-    return [default_output(source="not_found")]
+def _resolve_isbn_group(
+    group: List[tuple],
+    api_key: str,
+    strategy: str = DEFAULT_STRATEGY,
+    executor: Optional[ThreadPoolExecutor] = None,
+    use_cache: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Resolves a group of (path, evidence) pairs whose lookup starts with ISBN
+    queries, fetching all of those ISBNs in batch round trips first.
+    """
+    prefetch_isbn_queries(
+        [
+            step["query"]
+            for _, evidence in group
+            for step in _plan(evidence, strategy)
+            if step["kind"] == "isbn"
+        ],
+        api_key,
+    )
+    entries = []
+    for path, evidence in group:
+        try:
+            results = resolve_books_info(
+                evidence, api_key, strategy, executor, use_cache
+            )
+            entries.append({"path": path, "evidence": evidence, "results": results})
+        except Exception as e:
+            entries.append({"path": path, "evidence": evidence, "error": e})
+    return entries
+
+
+def _batch_error(file_path: str, error: BaseException) -> Dict[str, Any]:
+    logger.error(f"Failed to resolve {file_path}: {error}")
+    return {
+        "file_path": file_path,
+        "results": [],
+        "error": f"{type(error).__name__}: {error}",
+    }
+
+
+def iter_books_info_batch(
+    file_paths: Iterable[str | Path],
+    api_key: Optional[str] = None,
+    parse_workers: Optional[int] = None,
+    lookup_workers: int = 8,
+    max_pending: Optional[int] = None,
+    use_cache: bool = True,
+    batch_isbn: bool = False,
+    include_evidence: bool = False,
+    strategy: str = DEFAULT_STRATEGY,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Resolves many files concurrently and yields {"file_path", "results", "error"}
+    dicts in completion order.
+
+    File parsing (PDF and EPUB extraction) runs in a process pool and Google Books
+    lookups in a bounded thread pool. At most ``max_pending`` files are in flight, so
+    ``file_paths`` may be a lazy iterator over a very large tree. A failure while
+    handling one file is reported in its "error" field and never stops the batch.
+
+    With ``batch_isbn`` files whose lookup starts with an ISBN query are grouped and
+    their ISBNs fetched BATCH_SIZE at a time in batch HTTP requests. The batch
+    answers reach the files through the lookup cache, so without it (or with
+    ``use_cache`` off) every file is looked up on its own.
+    With ``include_evidence`` each dict also carries the file's "evidence".
+    With ``use_cache`` off no cache or local index is read (see get_books_info_list).
+    ``strategy`` selects how each file is looked up (see resolve_books_info).
+    """
+    # Loads multiprocessing, which only batch runs need
+    from concurrent.futures import ProcessPoolExecutor
+
+    check_strategy(strategy)
+    exhaustive = strategy == "parallel"
+    api_key = api_key or get_api_key()
+    parse_workers = parse_workers or os.cpu_count() or 1
+    max_pending = max_pending or 4 * (parse_workers + lookup_workers)
+    cache = get_file_cache() if use_cache else None
+    # Grouped files share the lookup cache entries their batch requests filled
+    batch_isbn = batch_isbn and use_cache and get_lookup_cache() is not None
+    # Worker processes hand their stage timings back to be recorded here
+    relay = get_recorder().active
+    paths = iter(file_paths)
+    pending: Dict[Future, tuple] = {}
+    isbn_group: List[tuple] = []
 
+    def resolved(
+        path: str, results: List[Dict[str, Any]], evidence: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        entry = {"file_path": path, "results": results, "error": None}
+        if include_evidence:
+            entry["evidence"] = evidence
+        return entry
 
-def get_google_books_image_url(query: str, api_key: str) -> Optional[str]:
+    with (
+        ProcessPoolExecutor(max_workers=parse_workers) as parse_pool,
+        ThreadPoolExecutor(max_workers=lookup_workers) as lookup_pool,
+        # Every lookup worker may be waiting on a full set of parallel queries;
+        # threads are only started once the parallel strategy submits to it
+        ThreadPoolExecutor(
+            max_workers=lookup_workers * MAX_PARALLEL_QUERIES,
+            thread_name_prefix="parallel",
+        ) as query_pool,
+    ):
+
+        def fill() -> Iterator[Dict[str, Any]]:
+            # Files that need no parsing are answered directly while filling
+            while len(pending) + len(isbn_group) < max_pending:
+                path = next(paths, None)
+                if path is None:
+                    return
+                path = str(path)
+                try:
+                    answer = early_answer(path, api_key, cache, strategy)
+                    if answer is not None:
+                        yield resolved(path, *answer)
+                        continue
+                    if relay:
+                        future = parse_pool.submit(
+                            call_with_events,
+                            collect_file_evidence,
+                            path,
+                            None,
+                            exhaustive,
+                        )
+                    else:
+                        future = parse_pool.submit(
+                            collect_file_evidence, path, None, exhaustive
+                        )
+                    pending[future] = ("parse", path, None)
+                except Exception as e:
+                    yield _batch_error(path, e)
+
+        def flush_isbn_group() -> None:
+            group = isbn_group[:]
+            isbn_group.clear()
+            future = lookup_pool.submit(
+                _resolve_isbn_group, group, api_key, strategy, query_pool, use_cache
+            )
+            pending[future] = ("isbn_group", None, None)
+
+        yield from fill()
+        while pending or isbn_group:
+            parsing = any(stage == "parse" for stage, _, _ in pending.values())
+            if isbn_group and (len(isbn_group) >= BATCH_SIZE or not parsing):
+                flush_isbn_group()
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, path, evidence = pending.pop(future)
+                if stage == "isbn_group":
+                    for entry in future.result():
+                        if "error" in entry:
+                            yield _batch_error(entry["path"], entry["error"])
+                            continue
+                        if cache is not None:
+                            cache.set(
+                                entry["path"], entry["results"], entry["evidence"]
+                            )
+                        yield resolved(
+                            entry["path"], entry["results"], entry["evidence"]
+                        )
+                    continue
+                try:
+                    if stage == "parse":
+                        evidence = future.result()
+                        if relay:
+                            evidence, events = evidence
+                            get_recorder().replay(events)
+                        steps = _plan(evidence, strategy)
+                        if batch_isbn and steps and steps[0]["kind"] == "isbn":
+                            isbn_group.append((path, evidence))
+                            continue
+                        future = lookup_pool.submit(
+                            resolve_books_info,
+                            evidence,
+                            api_key,
+                            strategy,
+                            query_pool,
+                            use_cache,
+                        )
+                        pending[future] = ("lookup", path, evidence)
+                        continue
+                    results = future.result()
+                    if cache is not None:
+                        cache.set(path, results, evidence)
+                    yield resolved(path, results, evidence)
+                except Exception as e:
+                    yield _batch_error(path, e)
+            yield from fill()
+
+
+def get_google_books_image_url(
+    query: str, api_key: Optional[str] = None
+) -> Optional[str]:
     """
     Returns the thumbnail image URL from the first Google Books API result for the query.
     """
-    items = query_google_books_api(query, api_key)
+    try:
+        items = query_google_books_api(query, api_key)
+    except BookLookupError as e:
+        logger.warning(f"Could not fetch cover URL: {e}")
+        return None
     if items:
         volume = items[0].get("volumeInfo", {})
         image_links = volume.get("imageLinks", {})
@@ -271,47 +1225,45 @@ def get_google_books_image_url(query: str, api_key: str) -> Optional[str]:
     return None
 
 
-def extract_first_page_image_pdf(file_path: str) -> Optional[Image.Image]:
+def extract_first_page_image_pdf(
+    file_path: str,
+    document: Optional[PdfDocument] = None,
+    size: Optional[tuple] = None,
+) -> Optional["Image.Image"]:
     """
-    Returns a PIL Image of the first page of a PDF file.
+    Returns a PIL Image of the first page of a PDF file. With a (width, height)
+    ``size`` the page is only rendered as large as needed to fit it, and a
+    scanned page is taken straight from its embedded image.
     """
     try:
-        with pdfplumber.open(file_path) as pdf:
-            if pdf.pages:
-                page = pdf.pages[0]
-                # Render as image (requires pdfplumber[image] and Pillow)
-                return page.to_image(resolution=200).original
+        with _open_pdf(file_path, document) as doc, timer("cover", format="pdf"):
+            if size is not None:
+                return doc.render_cover(size)
+            # Render as image (requires pdfplumber[image] and Pillow)
+            return doc.render_first_page(resolution=200)
     except Exception as e:
         logger.warning(f"Failed to extract first page image from PDF: {e}")
     return None
 
 
-def extract_cover_image_epub(epub_path: str) -> bytes | None:
+def extract_cover_image_epub(
+    epub_path: str, reader: Optional[EpubReader] = None
+) -> bytes | None:
     """
     Extracts the cover image from an EPUB file and returns it as bytes.
     Returns None if no cover image is found.
     """
-    from ebooklib import epub
-
-    book = epub.read_epub(epub_path)
-    cover_id = None
-
-    # Step 1: Try to find the cover id from the OPF metadata
-    for meta, attrs in book.get_metadata("OPF", "cover"):
-        if attrs.get("name") == "cover" and "content" in attrs:
-            cover_id = attrs["content"]
-            break
-
-    # Step 2: If cover_id found, get the corresponding item
-    if cover_id:
-        item = book.get_item_with_id(cover_id)
-        if item:
-            return item.get_content()
-    else:
-        # Fallback: Try to find the first image in the manifest
-        import ebooklib
+    with _open_epub(epub_path, reader) as book, timer("cover", format="epub"):
+        return book.cover_bytes()
 
-        for item in book.get_items_of_type(ebooklib.ITEM_IMAGE):
-            return item.get_content()
 
+def open_document(file_path: str) -> PdfDocument | EpubReader | None:
+    """
+    Returns a lazily opened document for the file, to be shared between
+    get_books_info_list and cover extraction. Close it when done.
+    """
+    if is_pdf(file_path):
+        return PdfDocument(file_path)
+    if is_epub(file_path):
+        return EpubReader(file_path)
     return None
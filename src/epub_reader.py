@@ -0,0 +1,111 @@
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Optional, Dict, Any, List
+from urllib.parse import unquote
+
+from instrumentation import timer
+
+CONTAINER_PATH = "META-INF/container.xml"
+
+
+class EpubReader:
+    """
+    Minimal EPUB reader that only parses ``container.xml`` and the OPF package file.
+
+    Chapters and images are never loaded; the cover image is read from the zip on
+    demand. Memory use and latency therefore do not depend on the size of the book.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._opf: Optional[ET.Element] = None
+        self._opf_dir = ""
+
+    @property
+    def zip(self) -> zipfile.ZipFile:
+        if self._zip is None:
+            self._zip = zipfile.ZipFile(self.file_path)
+        return self._zip
+
+    @property
+    def opf(self) -> ET.Element:
+        if self._opf is None:
+            with timer("epub_parse"):
+                container = ET.fromstring(self.zip.read(CONTAINER_PATH))
+                rootfile = container.find(".//{*}rootfile")
+                if rootfile is None or not rootfile.get("full-path"):
+                    raise ValueError("EPUB container.xml has no rootfile")
+                opf_path = rootfile.get("full-path")
+                self._opf_dir = posixpath.dirname(opf_path)
+                self._opf = ET.fromstring(self.zip.read(opf_path))
+        return self._opf
+
+    def _dc_values(self, name: str) -> List[str]:
+        return [
+            el.text.strip()
+            for el in self.opf.findall(f"{{*}}metadata/{{*}}{name}")
+            if el.text and el.text.strip()
+        ]
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        meta = {}
+        for val in self._dc_values("identifier"):
+            if len(val) == 10 or len(val) == 13:
+                meta["isbn"] = val
+        titles = self._dc_values("title")
+        if titles:
+            meta["title"] = titles[0]
+        creators = self._dc_values("creator")
+        if creators:
+            meta["author"] = creators[0]
+        return meta
+
+    def _manifest(self) -> List[ET.Element]:
+        return self.opf.findall("{*}manifest/{*}item")
+
+    def cover_href(self) -> Optional[str]:
+        """
+        Locates the cover image: the EPUB 2 ``<meta name="cover">`` entry, then the
+        EPUB 3 ``cover-image`` property, then the first image in the manifest.
+        """
+        manifest = self._manifest()
+        cover_id = None
+        for meta in self.opf.findall("{*}metadata/{*}meta"):
+            if meta.get("name") == "cover" and meta.get("content"):
+                cover_id = meta.get("content")
+                break
+        if cover_id:
+            for item in manifest:
+                if item.get("id") == cover_id and item.get("href"):
+                    return item.get("href")
+        for item in manifest:
+            if "cover-image" in (item.get("properties") or "").split():
+                return item.get("href")
+        for item in manifest:
+            if (item.get("media-type") or "").startswith("image/"):
+                return item.get("href")
+        return None
+
+    def cover_bytes(self) -> Optional[bytes]:
+        href = self.cover_href()
+        if not href:
+            return None
+        path = posixpath.normpath(posixpath.join(self._opf_dir, unquote(href)))
+        try:
+            return self.zip.read(path)
+        except KeyError:
+            return None
+
+    def close(self) -> None:
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+    def __enter__(self) -> "EpubReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,133 @@
+import json
+import time
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Optional, List
+
+if TYPE_CHECKING:
+    from googleapiclient.errors import HttpError
+
+# Error reasons (and quota names) Google uses when a daily quota is used up,
+# as opposed to a short-term rate limit that clears within seconds
+QUOTA_MARKERS = ("dailylimitexceeded", "quotaexceeded", "perday")
+
+
+class BookLookupError(Exception):
+    """
+    A Google Books lookup failed. Subclasses tell callers whether retrying can help.
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class TransientLookupError(BookLookupError):
+    """
+    Rate limiting (429), server errors (5xx) and network failures: worth retrying.
+    ``retry_after`` holds the server's Retry-After delay in seconds, if it sent one.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        status: Optional[int] = None,
+        retry_after: Optional[float] = None,
+    ):
+        super().__init__(message, status)
+        self.retry_after = retry_after
+
+
+class PermanentLookupError(BookLookupError):
+    """
+    The request itself is wrong (400, 401, 403, 404...): retrying cannot help.
+    """
+
+
+class InvalidQueryError(PermanentLookupError):
+    """
+    Google Books rejected this particular query (400); other queries may still work.
+    """
+
+
+class QuotaExceededError(BookLookupError):
+    """
+    The API key's quota is used up. No request should be sent until it resets.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        status: Optional[int] = None,
+        retry_after: Optional[float] = None,
+    ):
+        super().__init__(message, status)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parses a Retry-After header, either delay seconds or an HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _error_reasons(error: "HttpError") -> List[str]:
+    """
+    Returns the machine-readable reasons (and quota names) in a Google API error
+    body, lowercased and without underscores.
+    """
+    try:
+        body = json.loads(error.content.decode("utf-8"))
+        details = body["error"]
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return []
+    if not isinstance(details, dict):
+        return []
+    reasons = []
+    for entry in (details.get("errors") or []) + (details.get("details") or []):
+        if isinstance(entry, dict):
+            reasons.append(str(entry.get("reason", "")))
+            reasons.extend(str(v) for v in (entry.get("metadata") or {}).values())
+    return [reason.lower().replace("_", "") for reason in reasons]
+
+
+def classify_error(error: BaseException) -> BookLookupError:
+    """
+    Maps an exception raised while talking to Google Books to a BookLookupError.
+    Exceptions that are not HTTP or network failures are treated as permanent.
+    """
+    # Only imported once something went wrong; both come with the API client
+    import httplib2
+    from googleapiclient.errors import HttpError
+
+    if isinstance(error, BookLookupError):
+        return error
+    if isinstance(error, HttpError):
+        status = error.resp.status
+        message = f"HTTP {status}: {error.reason}"
+        retry_after = parse_retry_after(error.resp.get("retry-after"))
+        reasons = _error_reasons(error)
+        if status in (403, 429) and any(
+            marker in reason for reason in reasons for marker in QUOTA_MARKERS
+        ):
+            return QuotaExceededError(message, status, retry_after)
+        if status == 429 or status == 408 or status >= 500:
+            return TransientLookupError(message, status, retry_after)
+        if status == 403 and any("ratelimitexceeded" in r for r in reasons):
+            return TransientLookupError(message, status, retry_after)
+        if status == 400:
+            return InvalidQueryError(message, status)
+        return PermanentLookupError(message, status)
+    # Timeouts, refused or reset connections, DNS and TLS failures are all OSErrors
+    if isinstance(error, (OSError, httplib2.HttpLib2Error)):
+        return TransientLookupError(f"{type(error).__name__}: {error}")
+    return PermanentLookupError(f"{type(error).__name__}: {error}")
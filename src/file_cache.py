@@ -0,0 +1,199 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+from lookup_cache import DEFAULT_NEGATIVE_TTL
+from utils import default_cache_dir, file_fingerprint, partial_content_hash
+
+logger = logging.getLogger("bookinfo")
+
+
+def is_negative(results: List[Dict[str, Any]]) -> bool:
+    """
+    True for a "not found" answer: no result names a book.
+    """
+    return not any(result.get("title") for result in results)
+
+
+class FileResultCache:
+    """
+    Persistent cache of lookup results and extracted evidence per file.
+
+    Entries are keyed by (path, size, mtime). With ``use_content_hash`` enabled a
+    partial content hash is stored as well, so a renamed or moved file is still
+    recognized without being parsed again. Negative answers expire after
+    ``negative_ttl`` seconds, like the negative entries of the lookup cache, so
+    files Google could not identify are looked up again.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        use_content_hash: bool = True,
+        negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+    ):
+        self.path = Path(path) if path else default_cache_dir() / "files.sqlite3"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.use_content_hash = use_content_hash
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime REAL NOT NULL,"
+            " content_hash TEXT,"
+            " results TEXT NOT NULL,"
+            " evidence TEXT NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS files_content_hash ON files (content_hash)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return str(Path(file_path).resolve())
+
+    def _expired(self, results: List[Dict[str, Any]], updated: float) -> bool:
+        return is_negative(results) and time.time() - updated > self.negative_ttl
+
+    def get(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns {"results": [...], "evidence": {...}} for an unchanged file, or None.
+
+        A file recognized by its content under another path also gets
+        "renamed_from", the path it was cached under. Its evidence still describes
+        the old filename; the caller re-derives the filename evidence and stores
+        the entry again with set() if it can be reused.
+        """
+        key = self._key(file_path)
+        try:
+            size, mtime = file_fingerprint(file_path)
+        except OSError:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime, results, evidence, updated FROM files"
+                " WHERE path = ?",
+                (key,),
+            ).fetchone()
+        if row is not None and row[0] == size and row[1] == mtime:
+            results = json.loads(row[2])
+            if self._expired(results, row[4]):
+                return None
+            return {"results": results, "evidence": json.loads(row[3])}
+        if not self.use_content_hash:
+            return None
+
+        content_hash = partial_content_hash(file_path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path, results, evidence, updated FROM files"
+                " WHERE content_hash = ? AND size = ? LIMIT 1",
+                (content_hash, size),
+            ).fetchone()
+        if row is None:
+            return None
+        old_path, results = row[0], json.loads(row[1])
+        if self._expired(results, row[3]):
+            return None
+        logger.info(f"Recognized {file_path} as previously seen {old_path}")
+        if old_path != key and not os.path.exists(old_path):
+            self.forget(old_path)
+        return {
+            "results": results,
+            "evidence": json.loads(row[2]),
+            "renamed_from": old_path,
+        }
+
+    def set(
+        self,
+        file_path: str,
+        results: List[Dict[str, Any]],
+        evidence: Dict[str, Any],
+    ) -> None:
+        try:
+            size, mtime = file_fingerprint(file_path)
+        except OSError:
+            return
+        content_hash = (
+            partial_content_hash(file_path) if self.use_content_hash else None
+        )
+        self._store(self._key(file_path), size, mtime, content_hash, results, evidence)
+
+    def _store(
+        self,
+        key: str,
+        size: int,
+        mtime: float,
+        content_hash: Optional[str],
+        results: List[Dict[str, Any]],
+        evidence: Dict[str, Any],
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files"
+                " (path, size, mtime, content_hash, results, evidence, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    size,
+                    mtime,
+                    content_hash,
+                    json.dumps(results, ensure_ascii=False),
+                    json.dumps(evidence, ensure_ascii=False),
+                    time.time(),
+                ),
+            )
+            self._conn.commit()
+
+    def forget(self, file_path: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE path = ?", (file_path,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM files")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_file_cache: Optional[FileResultCache] = None
+_file_cache_lock = threading.Lock()
+
+
+def get_file_cache() -> Optional[FileResultCache]:
+    """
+    Returns the shared file result cache, or None when BOOKINFO_FILE_CACHE is "0".
+    Set BOOKINFO_FILE_CACHE_CONTENT_HASH to "0" to match on (path, size, mtime) only.
+    Negative answers expire after BOOKINFO_LOOKUP_CACHE_NEGATIVE_TTL seconds.
+    """
+    global _file_cache
+    if os.getenv("BOOKINFO_FILE_CACHE", "1") == "0":
+        return None
+    if _file_cache is None:
+        with _file_cache_lock:
+            if _file_cache is None:
+                _file_cache = FileResultCache(
+                    use_content_hash=os.getenv("BOOKINFO_FILE_CACHE_CONTENT_HASH", "1")
+                    != "0",
+                    negative_ttl=float(
+                        os.getenv(
+                            "BOOKINFO_LOOKUP_CACHE_NEGATIVE_TTL", DEFAULT_NEGATIVE_TTL
+                        )
+                    ),
+                )
+    return _file_cache
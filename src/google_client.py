@@ -0,0 +1,105 @@
+import logging
+import threading
+from typing import TYPE_CHECKING, Dict, Any, List
+
+from instrumentation import count
+
+if TYPE_CHECKING:
+    import httplib2
+
+logger = logging.getLogger("bookinfo")
+
+HTTP_TIMEOUT = 30
+BATCH_SIZE = 50  # sub-requests per batch round trip
+
+
+class GoogleBooksClient:
+    """
+    Google Books service built once per API key and shared between threads.
+
+    The discovery document is parsed a single time. httplib2 connections are not
+    thread-safe, so every thread keeps its own keep-alive ``Http`` object and
+    reuses its open connection for all of its requests.
+    """
+
+    def __init__(self, api_key: str, timeout: int = HTTP_TIMEOUT):
+        # googleapiclient is slow to import; load it with the first client
+        import httplib2
+        from googleapiclient.discovery import build
+
+        self.api_key = api_key
+        self.timeout = timeout
+        self._local = threading.local()
+        self._service = build(
+            "books",
+            "v1",
+            developerKey=api_key,
+            http=httplib2.Http(timeout=timeout),
+            static_discovery=True,
+        )
+        count("google_client_builds")
+
+    def _thread_http(self) -> "httplib2.Http":
+        import httplib2
+
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = httplib2.Http(timeout=self.timeout)
+            self._local.http = http
+        return http
+
+    def list_volumes(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+        request = self._service.volumes().list(q=query, maxResults=max_results)
+        http = self._thread_http()
+        # httplib2 keeps open connections keyed by "scheme:authority"
+        count("google_connections", state="reused" if http.connections else "new")
+        response = request.execute(http=http)
+        return response.get("items", [])
+
+    def list_volumes_batch(
+        self, queries: List[str], max_results: int = 5
+    ) -> Dict[str, Any]:
+        """
+        Sends up to BATCH_SIZE volume queries in one batch HTTP round trip.
+
+        Returns a dict mapping each query to its items, or to the exception
+        raised for that sub-request.
+        """
+        results: Dict[str, Any] = {}
+
+        def callback(request_id, response, exception):
+            query = queries[int(request_id)]
+            if exception is not None:
+                results[query] = exception
+            else:
+                results[query] = response.get("items", [])
+
+        batch = self._service.new_batch_http_request(callback=callback)
+        for i, query in enumerate(queries):
+            batch.add(
+                self._service.volumes().list(q=query, maxResults=max_results),
+                request_id=str(i),
+            )
+        http = self._thread_http()
+        count("google_connections", state="reused" if http.connections else "new")
+        batch.execute(http=http)
+        return results
+
+
+_clients: Dict[str, GoogleBooksClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key: str) -> GoogleBooksClient:
+    """
+    Returns the shared client for the API key, building it on first use.
+    """
+    client = _clients.get(api_key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(api_key)
+            if client is None:
+                logger.info("Building Google Books API client")
+                client = GoogleBooksClient(api_key)
+                _clients[api_key] = client
+    return client
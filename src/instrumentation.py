@@ -0,0 +1,416 @@
+import atexit
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Iterator, Tuple
+
+logger = logging.getLogger("bookinfo")
+
+# The Prometheus textfile is rewritten at most this often (and on exit)
+PROMETHEUS_WRITE_INTERVAL = 10.0
+# Upper bounds, in seconds, of the stage duration histogram buckets
+PROMETHEUS_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of already sorted values.
+    """
+    if not values:
+        return 0.0
+    rank = math.ceil(fraction * len(values))
+    return values[max(0, min(len(values), rank) - 1)]
+
+
+def _label_key(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Sink:
+    """
+    Receives instrumentation events: dicts with a "type" ("timer" or "counter"),
+    a "name", "labels" and either "seconds" or "value".
+    """
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+
+class MemorySink(Sink):
+    """
+    Keeps every timing in memory for a summary at the end of a run (--profile).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings: Dict[Tuple[str, tuple], List[float]] = {}
+        self.counters: Dict[Tuple[str, tuple], float] = {}
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        key = (event["name"], _label_key(event["labels"]))
+        with self._lock:
+            if event["type"] == "timer":
+                self.timings.setdefault(key, []).append(event["seconds"])
+            else:
+                self.counters[key] = self.counters.get(key, 0) + event["value"]
+
+    def snapshot(self) -> Tuple[Dict, Dict]:
+        """
+        Copies of the timings (sorted) and counters, keyed by (name, labels).
+        """
+        with self._lock:
+            timings = {key: sorted(values) for key, values in self.timings.items()}
+            return timings, dict(self.counters)
+
+    def summary(self, by: Tuple[str, ...] = ("source", "strategy")) -> List[Dict]:
+        """
+        Returns one row per stage with count, total, p50, p95 and max seconds,
+        followed by a row for each value of the ``by`` labels seen on that stage.
+        """
+        groups: Dict[Tuple[str, tuple], List[float]] = {}
+        timings, _ = self.snapshot()
+        for (name, labels), values in timings.items():
+            groups.setdefault((name, ()), []).extend(values)
+            picked = tuple((k, v) for k, v in labels if k in by)
+            if picked:
+                groups.setdefault((name, picked), []).extend(values)
+        rows = []
+        for (name, labels), values in sorted(groups.items()):
+            values.sort()
+            rows.append(
+                {
+                    "stage": name,
+                    "labels": dict(labels),
+                    "count": len(values),
+                    "total": sum(values),
+                    "p50": percentile(values, 0.5),
+                    "p95": percentile(values, 0.95),
+                    "max": values[-1],
+                }
+            )
+        return rows
+
+    def counter_totals(self) -> List[Dict[str, Any]]:
+        _, counters = self.snapshot()
+        return [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(counters.items())
+        ]
+
+
+class JsonLogSink(Sink):
+    """
+    Appends every event as one JSON line to a file.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class PrometheusTextfileSink(Sink):
+    """
+    Aggregates events into a Prometheus text exposition file, for the
+    node_exporter textfile collector: a ``bookinfo_stage_seconds`` histogram per
+    stage and labels (quantiles come from histogram_quantile), and a
+    ``bookinfo_<name>_total`` counter per counter. Only running bucket counts,
+    sums and totals are kept, so memory does not grow with the number of events.
+    The file is replaced atomically.
+    """
+
+    def __init__(self, path: str, write_interval: float = PROMETHEUS_WRITE_INTERVAL):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.write_interval = write_interval
+        self._lock = threading.Lock()
+        # (name, labels) -> [count per bucket..., count above the last bound,
+        # count, sum]
+        self._histograms: Dict[Tuple[str, tuple], List[float]] = {}
+        self._counters: Dict[Tuple[str, tuple], float] = {}
+        self._last_write = 0.0
+        self._write_lock = threading.Lock()
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        key = (event["name"], _label_key(event["labels"]))
+        with self._lock:
+            if event["type"] == "timer":
+                seconds = event["seconds"]
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = [0] * (
+                        len(PROMETHEUS_BUCKETS) + 3
+                    )
+                histogram[bisect.bisect_left(PROMETHEUS_BUCKETS, seconds)] += 1
+                histogram[-2] += 1
+                histogram[-1] += seconds
+            else:
+                self._counters[key] = self._counters.get(key, 0) + event["value"]
+        if time.monotonic() - self._last_write >= self.write_interval:
+            self.flush()
+
+    @staticmethod
+    def _labels(labels, **extra) -> str:
+        items = list(labels) + [(k, str(v)) for k, v in extra.items()]
+        if not items:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+    def render(self) -> str:
+        lines = [
+            "# HELP bookinfo_stage_seconds Time spent per stage.",
+            "# TYPE bookinfo_stage_seconds histogram",
+        ]
+        with self._lock:
+            histograms = {key: list(h) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+        for (name, labels), histogram in sorted(histograms.items()):
+            labels = (("stage", name),) + labels
+            cumulative = 0
+            for bound, hits in zip(PROMETHEUS_BUCKETS + ("+Inf",), histogram):
+                cumulative += hits
+                lines.append(
+                    f"bookinfo_stage_seconds_bucket{self._labels(labels, le=bound)} "
+                    f"{cumulative}"
+                )
+            lines.append(
+                f"bookinfo_stage_seconds_sum{self._labels(labels)} {histogram[-1]:.6f}"
+            )
+            lines.append(
+                f"bookinfo_stage_seconds_count{self._labels(labels)} {histogram[-2]}"
+            )
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE bookinfo_{name}_total counter")
+            for (counter, labels), value in sorted(counters.items()):
+                if counter == name:
+                    lines.append(
+                        f"bookinfo_{name}_total{self._labels(labels)} {value:g}"
+                    )
+        return "\n".join(lines) + "\n"
+
+    def flush(self) -> None:
+        with self._write_lock:
+            self._last_write = time.monotonic()
+            tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(self.render(), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+
+
+class Timer:
+    """
+    Context manager timing one stage. Labels may still be added inside the block,
+    e.g. the source of the answer once it is known.
+    """
+
+    __slots__ = ("recorder", "name", "labels", "start")
+
+    def __init__(self, recorder: "Recorder", name: str, labels: Dict[str, Any]):
+        self.recorder = recorder
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self) -> "Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.recorder.active:
+            seconds = time.perf_counter() - self.start
+            if exc_type is not None:
+                self.labels["error"] = exc_type.__name__
+            self.recorder.emit(
+                {
+                    "type": "timer",
+                    "name": self.name,
+                    "labels": self.labels,
+                    "seconds": seconds,
+                    "time": time.time(),
+                }
+            )
+
+
+class Recorder:
+    """
+    Dispatches timers and counters to the registered sinks. Without sinks (the
+    default) a timer only reads the clock, so instrumented code pays next to
+    nothing. Safe to use from several threads.
+
+    Events recorded inside capture() are collected for the calling thread instead
+    of being sent to the sinks; worker processes use this to hand their events
+    back to the parent, which replays them (see call_with_events).
+    """
+
+    def __init__(self, sinks: Optional[List[Sink]] = None):
+        self.sinks: List[Sink] = list(sinks or [])
+        self._local = threading.local()
+
+    @property
+    def active(self) -> bool:
+        return bool(self.sinks) or getattr(self._local, "events", None) is not None
+
+    def add_sink(self, sink: Sink) -> Sink:
+        self.sinks = self.sinks + [sink]
+        return sink
+
+    def remove_sink(self, sink: Sink) -> None:
+        self.sinks = [s for s in self.sinks if s is not sink]
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        captured = getattr(self._local, "events", None)
+        if captured is not None:
+            captured.append(event)
+            return
+        for sink in self.sinks:
+            try:
+                sink.emit(event)
+            except Exception as e:
+                logger.warning(
+                    f"Instrumentation sink {type(sink).__name__} failed: {e}"
+                )
+
+    def replay(self, events: List[Dict[str, Any]]) -> None:
+        for event in events:
+            self.emit(event)
+
+    def timer(self, name: str, **labels) -> Timer:
+        return Timer(self, name, labels)
+
+    def count(self, name: str, value: float = 1, **labels) -> None:
+        if self.active:
+            self.emit(
+                {
+                    "type": "counter",
+                    "name": name,
+                    "labels": labels,
+                    "value": value,
+                    "time": time.time(),
+                }
+            )
+
+    @contextmanager
+    def capture(self) -> Iterator[List[Dict[str, Any]]]:
+        previous = getattr(self._local, "events", None)
+        self._local.events = events = []
+        try:
+            yield events
+        finally:
+            self._local.events = previous
+
+    def flush(self) -> None:
+        for sink in self.sinks:
+            try:
+                sink.flush()
+            except Exception as e:
+                logger.warning(
+                    f"Instrumentation sink {type(sink).__name__} failed: {e}"
+                )
+
+
+_recorder: Optional[Recorder] = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder() -> Recorder:
+    """
+    Returns the process-wide recorder. BOOKINFO_METRICS_JSON adds a JSON log sink
+    and BOOKINFO_METRICS_PROMETHEUS a Prometheus textfile sink at those paths.
+    """
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                sinks: List[Sink] = []
+                if os.getenv("BOOKINFO_METRICS_JSON"):
+                    sinks.append(JsonLogSink(os.getenv("BOOKINFO_METRICS_JSON")))
+                if os.getenv("BOOKINFO_METRICS_PROMETHEUS"):
+                    sinks.append(
+                        PrometheusTextfileSink(os.getenv("BOOKINFO_METRICS_PROMETHEUS"))
+                    )
+                _recorder = Recorder(sinks)
+                atexit.register(_recorder.flush)
+    return _recorder
+
+
+def timer(name: str, **labels) -> Timer:
+    """
+    Times a stage: ``with timer("pdf_text", format="pdf"): ...``
+    """
+    return get_recorder().timer(name, **labels)
+
+
+def count(name: str, value: float = 1, **labels) -> None:
+    get_recorder().count(name, value, **labels)
+
+
+def call_with_events(func, *args) -> Tuple[Any, List[Dict[str, Any]]]:
+    """
+    Runs ``func(*args)`` and returns its result with the events it recorded.
+    Submit this to a process pool and replay the events in the parent, since
+    sinks (and --profile) live in the parent process.
+    """
+    with get_recorder().capture() as events:
+        result = func(*args)
+    return result, events
+
+
+def format_summary(sink: MemorySink) -> str:
+    """
+    Renders a MemorySink as the table printed by ``cli.py --profile``.
+    """
+    rows = []
+    for row in sink.summary():
+        name = row["stage"]
+        if row["labels"]:
+            name = "  " + " ".join(f"{k}={v}" for k, v in row["labels"].items())
+        rows.append((name, row))
+    counters = [
+        (" ".join([c["name"]] + [f"{k}={v}" for k, v in c["labels"].items()]), c)
+        for c in sink.counter_totals()
+    ]
+    width = max([len(name) for name, _ in rows + counters] + [len("counter")])
+    lines = [
+        f"{'stage':<{width}} {'count':>6} {'total s':>9} {'p50 ms':>9} "
+        f"{'p95 ms':>9} {'max ms':>9}"
+    ]
+    for name, row in rows:
+        lines.append(
+            f"{name:<{width}} {row['count']:>6} {row['total']:>9.2f} "
+            f"{row['p50'] * 1000:>9.1f} {row['p95'] * 1000:>9.1f} "
+            f"{row['max'] * 1000:>9.1f}"
+        )
+    if counters:
+        lines.append("")
+        lines.append(f"{'counter':<{width}} {'value':>6}")
+        for name, counter in counters:
+            lines.append(f"{name:<{width}} {counter['value']:>6g}")
+    return "\n".join(lines)
@@ -0,0 +1,411 @@
+import csv
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Iterable, Iterator
+
+from utils import (
+    default_cache_dir,
+    iter_isbn_matches,
+    normalize_title,
+    title_tokens,
+    to_isbn13,
+)
+
+logger = logging.getLogger("bookinfo")
+
+# A title query is answered locally only when a book matches it at least this well
+DEFAULT_MIN_SIMILARITY = 0.85
+MAX_RESULTS = 5  # items per answer, as many as a Google Books query returns
+MAX_CANDIDATES = 50  # books sharing tokens with the query that are scored
+AUTHOR_SEPARATORS = (";", "|")
+
+
+def _split_authors(value: Any) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        for separator in AUTHOR_SEPARATORS:
+            if separator in value:
+                return [a.strip() for a in value.split(separator) if a.strip()]
+        return [value.strip()]
+    return [str(a).strip() for a in value if str(a).strip()]
+
+
+def _parse_isbn(value: Any) -> Optional[str]:
+    """
+    Returns the normalized, checksum-valid ISBN in a field value, or None.
+    """
+    match = next(iter_isbn_matches(str(value)), None)
+    return match[0] if match else None
+
+
+def _first(record: Dict[str, Any], *keys: str) -> Any:
+    for key in keys:
+        if record.get(key):
+            return record[key]
+    return None
+
+
+def record_from_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Turns a Google Books item into an index record; the item itself is kept so
+    local answers are identical to the original response.
+    """
+    volume = item.get("volumeInfo", {})
+    record = {"title": volume.get("title"), "subtitle": volume.get("subtitle")}
+    for id_obj in volume.get("industryIdentifiers", []):
+        if id_obj.get("type") == "ISBN_10":
+            record["isbn_10"] = id_obj.get("identifier")
+        elif id_obj.get("type") == "ISBN_13":
+            record["isbn_13"] = id_obj.get("identifier")
+    record["authors"] = volume.get("authors")
+    record["year"] = (volume.get("publishedDate") or "")[:4] or None
+    record["item"] = item
+    return record
+
+
+def normalize_record(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Brings a dump row, a CLI result or a record_from_item() record into the stored
+    form. Accepts "isbn", "isbn_13"/"isbn13", "isbn_10"/"isbn10", "title",
+    "subtitle", "authors"/"authors_or_editors"/"author" (a list, or a string
+    separated by ";" or "|") and "year"/"year_of_publication"/"publishedDate".
+    Returns None for rows without a title.
+    """
+    title = (record.get("title") or "").strip()
+    if not title:
+        return None
+    isbns = [
+        isbn
+        for isbn in map(
+            _parse_isbn,
+            (
+                _first(record, "isbn_13", "isbn13"),
+                _first(record, "isbn_10", "isbn10"),
+                record.get("isbn"),
+            ),
+        )
+        if isbn
+    ]
+    isbn_13 = next(filter(None, map(to_isbn13, isbns)), None)
+    isbn_10 = next((isbn for isbn in isbns if len(isbn) == 10), None)
+    if isbn_10 and (not isbn_13 or to_isbn13(isbn_10) != isbn_13):
+        isbn_10 = None
+    authors = _split_authors(_first(record, "authors", "authors_or_editors", "author"))
+    year = str(_first(record, "year", "year_of_publication", "publishedDate") or "")[:4]
+    return {
+        "isbn_13": isbn_13,
+        "isbn_10": isbn_10,
+        "title": title,
+        "subtitle": (record.get("subtitle") or "").strip() or None,
+        "authors": authors,
+        "year": year if year.isdigit() else None,
+        "item": record.get("item"),
+    }
+
+
+def item_from_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Builds a Google Books-shaped item for a record imported from a dump.
+    """
+    identifiers = [
+        {"type": kind, "identifier": record[key]}
+        for kind, key in (("ISBN_13", "isbn_13"), ("ISBN_10", "isbn_10"))
+        if record.get(key)
+    ]
+    volume = {"title": record["title"], "industryIdentifiers": identifiers}
+    if record.get("subtitle"):
+        volume["subtitle"] = record["subtitle"]
+    if record.get("authors"):
+        volume["authors"] = record["authors"]
+    if record.get("year"):
+        volume["publishedDate"] = record["year"]
+    return {"id": f"local:{record['isbn_13'] or record['title']}", "volumeInfo": volume}
+
+
+def read_dump(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the rows of a CSV file (with a header row) or a JSON Lines file.
+    JSON lines written by cli.py ({"file_path", "results": [...]}) yield their
+    results, so earlier batch runs can be imported as they are.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        if Path(path).suffix.lower() == ".csv":
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(row, dict):
+                continue
+            if isinstance(row.get("results"), list):
+                yield from (r for r in row["results"] if isinstance(r, dict))
+            else:
+                yield row
+
+
+class LocalIndex:
+    """
+    Persistent SQLite index of known books, consulted before Google Books so that
+    books seen before (or imported from a bulk dump) resolve without the network.
+
+    Books are keyed by normalized ISBN-13 (books without one by title and first
+    author), and their title, subtitle and author words go into a token index
+    used for fuzzy title lookups. Answers are Google Books-shaped items.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        min_similarity: float = DEFAULT_MIN_SIMILARITY,
+    ):
+        self.path = Path(path) if path else default_cache_dir() / "index.sqlite3"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.min_similarity = min_similarity
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS books ("
+            " key TEXT PRIMARY KEY,"
+            " isbn_13 TEXT,"
+            " title TEXT NOT NULL,"
+            " subtitle TEXT,"
+            " authors TEXT NOT NULL,"
+            " item TEXT NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tokens ("
+            " token TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " PRIMARY KEY (token, key)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tokens_key ON tokens (key)")
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM books").fetchone()
+        return count
+
+    def _store(self, record: Dict[str, Any], now: float) -> None:
+        if record["isbn_13"]:
+            key = record["isbn_13"]
+        else:
+            author = record["authors"][0] if record["authors"] else ""
+            key = f"title:{normalize_title(record['title'])}|{normalize_title(author)}"
+        item = record["item"] or item_from_record(record)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO books"
+            " (key, isbn_13, title, subtitle, authors, item, updated)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                record["isbn_13"],
+                record["title"],
+                record["subtitle"],
+                json.dumps(record["authors"], ensure_ascii=False),
+                json.dumps(item, ensure_ascii=False),
+                now,
+            ),
+        )
+        self._conn.execute("DELETE FROM tokens WHERE key = ?", (key,))
+        words = title_tokens(
+            " ".join([record["title"], record["subtitle"] or ""] + record["authors"])
+        )
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO tokens (token, key) VALUES (?, ?)",
+            ((word, key) for word in words),
+        )
+
+    def add_records(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Adds or replaces books (see normalize_record for the accepted fields) in
+        one transaction. Returns the number of books stored.
+        """
+        now = time.time()
+        stored = 0
+        with self._lock:
+            for record in records:
+                record = normalize_record(record)
+                if record is None:
+                    continue
+                self._store(record, now)
+                stored += 1
+            self._conn.commit()
+        return stored
+
+    def add_items(self, items: List[Dict[str, Any]]) -> int:
+        """
+        Learns the books in a Google Books response.
+        """
+        return self.add_records(record_from_item(item) for item in items)
+
+    def import_dump(self, path: str) -> int:
+        """
+        Imports a CSV or JSON Lines dump (see read_dump). Returns the books stored.
+        """
+        stored = self.add_records(read_dump(path))
+        logger.info(f"Imported {stored} books into the local index from {path}")
+        return stored
+
+    def get_isbn(self, isbn: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the item for an ISBN-10 or ISBN-13, or None.
+        """
+        isbn = _parse_isbn(isbn)
+        isbn_13 = to_isbn13(isbn) if isbn else None
+        if isbn_13 is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT item FROM books WHERE key = ?", (isbn_13,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    @staticmethod
+    def _score(
+        query: str, title: str, subtitle: Optional[str], authors: List[str]
+    ) -> float:
+        """
+        Best similarity between the query and the title, alone or followed by the
+        subtitle and/or one of the authors (the forms our title queries take).
+        """
+        titles = [title, f"{title} {subtitle}"] if subtitle else [title]
+        variants = titles + [f"{t} {a}" for t in titles for a in authors]
+        return max(
+            SequenceMatcher(None, query, normalize_title(variant)).ratio()
+            for variant in variants
+        )
+
+    def search(self, text: str, limit: int = MAX_RESULTS) -> List[Dict[str, Any]]:
+        """
+        Returns the items of books whose title (with subtitle or author) matches
+        the text at least ``min_similarity``, best first.
+        """
+        words = title_tokens(text)
+        if not words:
+            return []
+        placeholders = ",".join("?" * len(words))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT b.title, b.subtitle, b.authors, b.item FROM books b JOIN ("
+                f" SELECT key, COUNT(*) AS hits FROM tokens"
+                f" WHERE token IN ({placeholders})"
+                " GROUP BY key ORDER BY hits DESC LIMIT ?) t ON b.key = t.key",
+                (*words, MAX_CANDIDATES),
+            ).fetchall()
+        query = normalize_title(text)
+        scored = []
+        for title, subtitle, authors, item in rows:
+            score = self._score(query, title, subtitle, json.loads(authors))
+            if score >= self.min_similarity:
+                scored.append((score, item))
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+        return [json.loads(item) for _, item in scored[:limit]]
+
+    def lookup(self, query: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Answers a Google Books query ("isbn:..." or free text) from the index.
+        Returns None when the index cannot answer it and Google must be asked.
+        """
+        if query.lower().startswith("isbn:"):
+            item = self.get_isbn(query[5:])
+            return [item] if item is not None else None
+        return self.search(query) or None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM books")
+            self._conn.execute("DELETE FROM tokens")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_local_index: Optional[LocalIndex] = None
+_local_index_lock = threading.Lock()
+
+
+def get_local_index() -> Optional[LocalIndex]:
+    """
+    Returns the shared local index, or None when BOOKINFO_LOCAL_INDEX is "0".
+    BOOKINFO_LOCAL_INDEX_PATH overrides its location and
+    BOOKINFO_LOCAL_INDEX_MIN_SIMILARITY the threshold for title matches.
+    """
+    global _local_index
+    if os.getenv("BOOKINFO_LOCAL_INDEX", "1") == "0":
+        return None
+    if _local_index is None:
+        with _local_index_lock:
+            if _local_index is None:
+                path = os.getenv("BOOKINFO_LOCAL_INDEX_PATH")
+                _local_index = LocalIndex(
+                    path=Path(path).expanduser() if path else None,
+                    min_similarity=float(
+                        os.getenv(
+                            "BOOKINFO_LOCAL_INDEX_MIN_SIMILARITY",
+                            DEFAULT_MIN_SIMILARITY,
+                        )
+                    ),
+                )
+    return _local_index
+
+
+def main():
+    # Only the command line needs argparse; core imports this module
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Manage the local book index consulted before Google Books."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser(
+        "import",
+        help="Import CSV or JSON Lines dumps (isbn, title, authors, year), "
+        "including JSON Lines written by cli.py.",
+    )
+    import_parser.add_argument("dumps", nargs="+")
+    commands.add_parser(
+        "learn", help="Add every book from the Google Books lookup cache."
+    )
+    commands.add_parser("stats", help="Print the number of indexed books.")
+    commands.add_parser("clear", help="Remove every book from the index.")
+    args = parser.parse_args()
+
+    from config import configure
+
+    configure()
+    index = get_local_index()
+    if index is None:
+        print("The local index is disabled (BOOKINFO_LOCAL_INDEX=0)", file=sys.stderr)
+        sys.exit(1)
+    if args.command == "import":
+        for dump in args.dumps:
+            index.import_dump(dump)
+    elif args.command == "learn":
+        from lookup_cache import get_lookup_cache
+
+        cache = get_lookup_cache()
+        if cache is not None:
+            stored = sum(index.add_items(items) for items in cache.iter_items())
+            logger.info(f"Learned {stored} books from the lookup cache")
+    elif args.command == "clear":
+        index.clear()
+    print(f"{len(index)} books in {index.path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
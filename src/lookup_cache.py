@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Iterator
+
+from utils import default_cache_dir
+
+logger = logging.getLogger("bookinfo")
+
+DEFAULT_TTL = 30 * 24 * 3600  # 30 days
+DEFAULT_NEGATIVE_TTL = 24 * 3600  # 1 day
+DEFAULT_MAX_ENTRIES = 50_000
+EVICT_EVERY = 200  # writes between eviction sweeps
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a Google Books query so trivially different spellings share a key.
+    """
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+class LookupCache:
+    """
+    Persistent SQLite cache of Google Books responses keyed by normalized query.
+
+    Empty responses are cached too (negative caching) with their own, shorter TTL.
+    When the table grows past ``max_entries`` the least recently used rows are evicted.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        ttl: float = DEFAULT_TTL,
+        negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.path = Path(path) if path else default_cache_dir() / "lookups.sqlite3"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS lookups ("
+            " key TEXT PRIMARY KEY,"
+            " items TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS lookups_accessed ON lookups (accessed)"
+        )
+        self._conn.commit()
+        self.evict()
+
+    def get(self, query: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Returns the cached items for the query ([] for a cached empty result),
+        or None when there is no fresh entry.
+        """
+        key = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT items, created FROM lookups WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            items = json.loads(row[0])
+            ttl = self.ttl if items else self.negative_ttl
+            if now - row[1] > ttl:
+                self._conn.execute("DELETE FROM lookups WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE lookups SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+        return items
+
+    def set(self, query: str, items: List[Dict[str, Any]]) -> None:
+        key = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO lookups (key, items, created, accessed)"
+                " VALUES (?, ?, ?, ?)",
+                (key, json.dumps(items, ensure_ascii=False), now, now),
+            )
+            self._conn.commit()
+            self._writes += 1
+            due = self._writes % EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def iter_items(self) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yields the items of every fresh, non-empty cached response.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT items FROM lookups WHERE items != '[]' AND created >= ?",
+                (time.time() - self.ttl,),
+            ).fetchall()
+        for (items,) in rows:
+            yield json.loads(items)
+
+    def evict(self) -> int:
+        """
+        Drops expired rows, then the least recently used rows above the size cap.
+        Returns the number of rows removed.
+        """
+        now = time.time()
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM lookups WHERE"
+                " (items != '[]' AND created < ?) OR (items = '[]' AND created < ?)",
+                (now - self.ttl, now - self.negative_ttl),
+            ).rowcount
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM lookups").fetchone()
+            if count > self.max_entries:
+                removed += self._conn.execute(
+                    "DELETE FROM lookups WHERE key IN ("
+                    " SELECT key FROM lookups ORDER BY accessed LIMIT ?)",
+                    (count - self.max_entries,),
+                ).rowcount
+            self._conn.commit()
+        if removed:
+            logger.info(f"Evicted {removed} Google Books lookup cache entries")
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM lookups")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_lookup_cache: Optional[LookupCache] = None
+_lookup_cache_lock = threading.Lock()
+
+
+def get_lookup_cache() -> Optional[LookupCache]:
+    """
+    Returns the shared lookup cache configured from the environment,
+    or None when BOOKINFO_LOOKUP_CACHE is set to "0".
+
+    BOOKINFO_LOOKUP_CACHE_TTL and BOOKINFO_LOOKUP_CACHE_NEGATIVE_TTL are in seconds,
+    BOOKINFO_LOOKUP_CACHE_MAX_ENTRIES caps the number of cached queries.
+    """
+    global _lookup_cache
+    if os.getenv("BOOKINFO_LOOKUP_CACHE", "1") == "0":
+        return None
+    if _lookup_cache is None:
+        with _lookup_cache_lock:
+            if _lookup_cache is None:
+                _lookup_cache = LookupCache(
+                    ttl=float(os.getenv("BOOKINFO_LOOKUP_CACHE_TTL", DEFAULT_TTL)),
+                    negative_ttl=float(
+                        os.getenv(
+                            "BOOKINFO_LOOKUP_CACHE_NEGATIVE_TTL", DEFAULT_NEGATIVE_TTL
+                        )
+                    ),
+                    max_entries=int(
+                        os.getenv(
+                            "BOOKINFO_LOOKUP_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES
+                        )
+                    ),
+                )
+    return _lookup_cache
@@ -1,91 +1,74 @@
 import flet as ft
+from concurrent.futures import CancelledError
 from pathlib import Path
 import os
 import io
-from PIL import Image
+import threading
+from typing import TYPE_CHECKING
+from config import configure, get_api_key
 from core import (
     get_books_info_list,
     extract_cover_image_epub,
     extract_first_page_image_pdf,
+    open_document,
 )
+from epub_reader import EpubReader
+from pdf_document import PdfDocument
+from autorename import load_review_queue
+from utils import build_new_filename_from_info, move_to_completed
+from prefetch import CancelToken, Prefetcher
+from thumbnails import THUMBNAIL_SIZE, get_thumbnail_store
 
-from dotenv import load_dotenv
+if TYPE_CHECKING:
+    from PIL import Image
 
 # --- Ensure assets directory exists ---
 ASSETS_DIR = Path(__file__).parent / "assets"
 
-THUMBNAIL_DIR = Path("/Users/anselm/.BookInfo/assets")
-THUMBNAIL_DIR.mkdir(exist_ok=True)
 
-load_dotenv()
-API_KEY = os.getenv("GOOGLE_BOOKS_API_KEY")
+def render_cover(
+    file_path_str: str, document: PdfDocument | EpubReader | None = None
+) -> "Image.Image | None":
+    """
+    Renders the first page of a PDF or loads the cover image of an EPUB.
+    An already open document (see core.open_document) is reused instead of
+    parsing the file again.
+    """
+    ext = Path(file_path_str).suffix.lower()
+    if ext == ".pdf":
+        return extract_first_page_image_pdf(file_path_str, document, THUMBNAIL_SIZE)
+    if ext == ".epub":
+        image_bytes = extract_cover_image_epub(file_path_str, document)
+        if image_bytes:
+            from PIL import Image
+
+            image = Image.open(io.BytesIO(image_bytes))
+            # Let the JPEG decoder skip detail the thumbnail will not show
+            image.draft("RGB", THUMBNAIL_SIZE)
+            return image
+    return None
 
 
-# Helper function to extract first page image and save to a temporary file
-def extract_first_page_image(file_path_str: str) -> str | None:
+# Helper function to get the first page image as a small thumbnail file
+def extract_first_page_image(
+    file_path_str: str, document: PdfDocument | EpubReader | None = None
+) -> str | None:
     """
-    Extracts the first page/cover image from a PDF or EPUB file.
-    Saves it as a PNG file in the assets directory and returns the path to this file.
+    Returns the path of a thumbnail of the first page/cover image of a PDF or EPUB
+    file from the thumbnail store, rendering it only if the file has none yet.
     Returns None if extraction fails or file type is unsupported.
     """
     try:
-        file_path = Path(file_path_str)
-        ext = file_path.suffix.lower()
-        pil_image = None
-
-        if ext == ".pdf":
-            pil_image = extract_first_page_image_pdf(file_path_str)
-        elif ext == ".epub":
-            image_bytes = extract_cover_image_epub(file_path_str)
-            if image_bytes:
-                pil_image = Image.open(io.BytesIO(image_bytes))
-
-        if pil_image:
-            # Convert to RGBA if it has a palette (P mode) to ensure PNG saving works well
-            if pil_image.mode == "P":
-                pil_image = pil_image.convert("RGBA")
-            elif pil_image.mode == "CMYK":  # common for PDFs
-                pil_image = pil_image.convert("RGB")
-
-            # Save to assets directory with a unique name
-            image_filename = f"{file_path.stem}_page1.png"
-            image_path = THUMBNAIL_DIR / image_filename
-            pil_image.save(image_path, "PNG")
-            return str(image_path)
+        return get_thumbnail_store().get_or_create(
+            file_path_str, lambda: render_cover(file_path_str, document)
+        )
     except Exception as e:
         print(f"Error extracting first page image for {file_path_str}: {e}")
     return None
 
 
-# Helper function to build the new filename
-def build_new_filename_from_info(info: dict, original_extension: str) -> str:
-    """Builds the new filename based on book info and original extension."""
-    isbn10 = info.get("isbn_10")
-    title = info.get("title") or "UnknownTitle"
-    subtitle = info.get("subtitle", "")  # Subtitle is optional
-    authors_list = info.get("authors_or_editors")
-
-    first_author = "UnknownAuthor"
-    if authors_list and isinstance(authors_list, list) and len(authors_list) > 0:
-        first_author = authors_list[0]
-
-    filename_parts = []
-    if isbn10:
-        filename_parts.append(isbn10)
-    if subtitle:
-        title = f"{title}; {subtitle}"
-    filename_parts.extend([title, first_author])
-
-    base_name = " - ".join(filename_parts)
-    base_name = f"{base_name}{original_extension}"
-
-    # Sanitize filename (remove characters not allowed in macOS filenames)
-    invalid_chars = '\\/:*?"<>|'
-    sanitized_name = "".join(c for c in base_name if c not in invalid_chars)
-    return sanitized_name.strip()
-
-
 def main(page: ft.Page):
+    api_key = get_api_key()
     page.title = "Book Renamer GUI"
     page.window.width = 1000
     page.window.height = 800
@@ -107,24 +90,42 @@ def main(page: ft.Page):
             )
             # Reverse the order to process from bottom to top
             current_files_in_dir = list(reversed(current_files_in_dir))
-
-            file_list_view.controls.clear()
-            if current_files_in_dir:
-                for f_path in reversed(current_files_in_dir):
-                    file_list_view.controls.append(ft.Text(f_path.name))
-                current_file_processing_index = 0
-                process_file(current_files_in_dir[current_file_processing_index])
-            else:
-                file_list_view.controls.append(ft.Text("No PDF or EPUB files found."))
-                processing_filename_text.value = "No files to process."
-                candidate_cards_column.controls.clear()
+            start_file_queue()
         else:
             selected_directory_text.value = "Directory selection cancelled."
         page.update()
 
+    def on_review_queue_result(e: ft.FilePickerResultEvent):
+        nonlocal current_files_in_dir
+        if e.files:
+            queue_file = e.files[0].path
+            selected_directory_text.value = f"Review queue: {queue_file}"
+            # Files the headless auto-rename pipeline could not decide on
+            current_files_in_dir = list(reversed(load_review_queue(queue_file)))
+            start_file_queue()
+        else:
+            selected_directory_text.value = "Review queue selection cancelled."
+        page.update()
+
+    def start_file_queue():
+        nonlocal current_file_processing_index
+        file_list_view.controls.clear()
+        prefetcher.clear()
+        if current_files_in_dir:
+            for f_path in reversed(current_files_in_dir):
+                file_list_view.controls.append(ft.Text(f_path.name))
+            current_file_processing_index = 0
+            process_file(current_files_in_dir[current_file_processing_index])
+        else:
+            file_list_view.controls.append(ft.Text("No PDF or EPUB files found."))
+            processing_filename_text.value = "No files to process."
+            candidate_cards_column.controls.clear()
+
     # Create FilePicker and append to overlay at the top of main()
     file_picker = ft.FilePicker(on_result=on_directory_result)
     page.overlay.append(file_picker)
+    review_queue_picker = ft.FilePicker(on_result=on_review_queue_result)
+    page.overlay.append(review_queue_picker)
     page.update()  # Ensure overlay is registered before any button click
 
     # --- Application State ---
@@ -149,18 +150,40 @@ def main(page: ft.Page):
         expand=True,
     )
 
-    temp_image_paths = []  # To store paths of temporary images for cleanup
-
-    # --- Event Handlers ---
-    def cleanup_temp_images():
-        nonlocal temp_image_paths
-        for temp_path_str in temp_image_paths:
+    def load_file_view(file_path: Path) -> dict:
+        """Resolves candidates and renders the cover (runs on prefetch threads)."""
+        # One parsed document serves the lookup and the cover render
+        document = open_document(str(file_path))
+        try:
             try:
-                if temp_path_str and Path(temp_path_str).exists():
-                    os.remove(temp_path_str)
+                book_candidates = get_books_info_list(
+                    str(file_path), api_key=api_key, document=document
+                )
             except Exception as e:
-                print(f"Error deleting temp image {temp_path_str}: {e}")
-        temp_image_paths = []
+                print(f"Error fetching book info for {file_path.name}: {e}")
+                book_candidates = []
+            # Render the file's cover once; all candidate cards show the same image
+            first_page_image_path = (
+                extract_first_page_image(str(file_path), document)
+                if book_candidates
+                else None
+            )
+        finally:
+            if document is not None:
+                document.close()
+        return {"candidates": book_candidates, "cover": first_page_image_path}
+
+    # Prepares the next files of the queue while the current one is reviewed
+    prefetcher = Prefetcher(load_file_view)
+    # Token of the file currently being shown; replaced (and cancelled) on every switch
+    display_token = CancelToken()
+    # Serializes card updates from worker threads with the event handlers
+    cards_lock = threading.Lock()
+
+    # --- Event Handlers ---
+    def stop_prefetching():
+        display_token.cancel()
+        prefetcher.clear()
 
     def remove_file_from_list(filename: str):
         # Remove the bottom-most occurrence of the filename in the reversed display list
@@ -171,8 +194,11 @@ def main(page: ft.Page):
         file_list_view.update()
 
     def process_file(file_path: Path):
-        nonlocal current_file_processing_index, temp_image_paths
-        cleanup_temp_images()  # Clean up images from previous file
+        nonlocal current_file_processing_index, display_token
+        # Anything still loading for the previously shown file is now stale
+        with cards_lock:
+            display_token.cancel()
+            display_token = CancelToken()
 
         # Highlight the current file at the bottom of the list
         display_index = len(file_list_view.controls) - 1 - current_file_processing_index
@@ -195,16 +221,41 @@ def main(page: ft.Page):
                 name = stem[:keep] + "..." + ext
             else:
                 name = "..." + ext
-        processing_filename_text.value = f"Processing: {name}"
-        candidate_cards_column.controls.clear()
-        candidate_cards_column.controls.append(ft.ProgressBar())  # Show loading
-        page.update()
+        with cards_lock:
+            processing_filename_text.value = f"Processing: {name}"
+            candidate_cards_column.controls.clear()
+            candidate_cards_column.controls.append(ft.ProgressBar())  # Show loading
+            page.update()
+
+        # Start (or keep) loading this file and the next ones in the queue
+        prefetcher.schedule(current_files_in_dir[current_file_processing_index:])
+        # Wait for the result off the Flet event handler so the window stays responsive
+        page.run_thread(show_file_when_ready, file_path, display_token)
 
+    def show_file_when_ready(file_path: Path, token: CancelToken):
         try:
-            book_candidates = get_books_info_list(str(file_path), api_key=API_KEY)
+            file_view = prefetcher.get(file_path)
+        except CancelledError:
+            return
         except Exception as e:
-            print(f"Error fetching book info for {file_path.name}: {e}")
-            book_candidates = []
+            print(f"Error preparing {file_path.name}: {e}")
+            file_view = {"candidates": [], "cover": None}
+        with cards_lock:
+            if token.cancelled:
+                # The user already moved on to another file
+                return
+            build_candidate_cards(
+                file_path, file_view["candidates"], file_view["cover"]
+            )
+
+    def build_candidate_cards(
+        file_path: Path, book_candidates: list, first_page_image_path: str | None
+    ):
+        # Thumbnails live in the thumbnail store; Flet loads them by absolute path
+        if first_page_image_path and os.path.exists(first_page_image_path):
+            image_src = first_page_image_path
+        else:
+            image_src = ASSETS_DIR / "No-image.png"
 
         candidate_cards_column.controls.clear()  # Remove progress bar
 
@@ -228,17 +279,6 @@ def main(page: ft.Page):
                     # error_content=ft.Text("?", size=30),
                 )
 
-                first_page_image_path = extract_first_page_image(str(file_path))
-                if first_page_image_path:
-                    temp_image_paths.append(first_page_image_path)
-
-                # Use /assets/filename.png for Flet static serving
-                if first_page_image_path and os.path.exists(first_page_image_path):
-                    image_filename = Path(first_page_image_path).name
-                    image_src = THUMBNAIL_DIR / image_filename
-                else:
-                    image_src = ASSETS_DIR / "No-image.png"
-
                 first_page_widget = ft.Image(
                     src=image_src,
                     width=100,
@@ -269,6 +309,11 @@ def main(page: ft.Page):
                 if not isinstance(year, str) or not year.strip():
                     year = "N/A"
 
+                confidence = candidate_info.get("confidence")
+                match_str = (
+                    f"{confidence:.0%}" if isinstance(confidence, float) else "N/A"
+                )
+
                 info_column = ft.Column(
                     [
                         ft.Text(f"ISBN: {isbn_10}"),
@@ -276,6 +321,7 @@ def main(page: ft.Page):
                         ft.Text(f"Subtitle: {subtitle}"),
                         ft.Text(f"Author(s): {authors_str}"),
                         ft.Text(f"Year: {year}"),
+                        ft.Text(f"Match: {match_str}"),
                     ],
                     spacing=3,
                     height=150,  # Adjust as needed, less than card_content height (220) minus button height
@@ -288,20 +334,9 @@ def main(page: ft.Page):
                         selected_info, current_file.suffix
                     )
 
-                    # Create completed subfolder in the same directory as the original file
-                    completed_dir = current_file.parent / "completed"
-                    completed_dir.mkdir(exist_ok=True)
-
-                    # The new file will be placed in the completed folder
-                    new_file_path = completed_dir / new_filename_str
-
                     try:
-                        # First rename the file
-                        temp_renamed_file = current_file.with_name(new_filename_str)
-                        current_file.rename(temp_renamed_file)
-
-                        # Then move the renamed file to completed folder
-                        temp_renamed_file.rename(new_file_path)
+                        # Rename the file into the completed subfolder
+                        move_to_completed(current_file, new_filename_str)
 
                         # Show success message
                         page.snack_bar = ft.SnackBar(
@@ -313,6 +348,7 @@ def main(page: ft.Page):
                         )
 
                         remove_file_from_list(current_file.name)
+                        prefetcher.cancel(current_file)
                         del current_files_in_dir[current_file_processing_index]
                     except Exception as ex:
                         print(f"Error renaming/moving file: {ex}")
@@ -330,7 +366,7 @@ def main(page: ft.Page):
                         processing_filename_text.value = "모든 파일 처리 완료."
                         candidate_cards_column.controls.clear()
                         candidate_cards_column.controls.append(ft.Text("완료!"))
-                        cleanup_temp_images()
+                        stop_prefetching()
                     page.update()
 
                 select_button = ft.ElevatedButton(
@@ -430,6 +466,7 @@ def main(page: ft.Page):
             )
 
             remove_file_from_list(skipped_filename)
+            prefetcher.cancel(current_files_in_dir[current_file_processing_index])
             del current_files_in_dir[current_file_processing_index]
         if current_file_processing_index < len(current_files_in_dir):
             process_file(current_files_in_dir[current_file_processing_index])
@@ -437,7 +474,7 @@ def main(page: ft.Page):
             processing_filename_text.value = "모든 파일 처리 완료."
             candidate_cards_column.controls.clear()
             candidate_cards_column.controls.append(ft.Text("완료!"))
-            cleanup_temp_images()
+            stop_prefetching()
         page.update()
 
     select_dir_button = ft.ElevatedButton(
@@ -449,10 +486,19 @@ def main(page: ft.Page):
         ),
     )
 
+    load_queue_button = ft.ElevatedButton(
+        "Load Review Queue",
+        icon=ft.Icons.PLAYLIST_ADD_CHECK,
+        on_click=lambda _: review_queue_picker.pick_files(
+            dialog_title="Select Review Queue",
+            allowed_extensions=["jsonl"],
+        ),
+    )
+
     # --- Layout ---
     left_panel = ft.Column(
         [
-            select_dir_button,
+            ft.Row([select_dir_button, load_queue_button], wrap=True),
             selected_directory_text,
             ft.Text("Files in directory:", weight=ft.FontWeight.BOLD),
             ft.Container(
@@ -473,7 +519,7 @@ def main(page: ft.Page):
     right_panel = ft.Column(
         [
             # ft.Text(
-            #     f"API Key: {API_KEY}",
+            #     f"API Key: {api_key}",
             #     weight=ft.FontWeight.BOLD,
             # ),
             processing_filename_text,
@@ -493,4 +539,6 @@ def main(page: ft.Page):
     page.update()
 
 
-ft.app(target=main)
+if __name__ == "__main__":
+    configure()
+    ft.app(target=main)
@@ -0,0 +1,295 @@
+import io
+import logging
+import math
+from typing import TYPE_CHECKING, Optional, Dict, Any, List, Iterator, Tuple
+
+from instrumentation import count, timer
+
+# pdfplumber (with pdfminer) and PIL are imported when a document is first read,
+# so files answered from a cache or by their filename never load them
+if TYPE_CHECKING:
+    import pdfplumber
+    from pdfminer.pdftypes import PDFStream
+    from PIL import Image
+
+logger = logging.getLogger("bookinfo")
+
+# Image XObject color spaces that map straight onto a PIL mode at 8 bits per component
+RAW_IMAGE_MODES = {"DeviceRGB": ("RGB", 3), "DeviceGray": ("L", 1)}
+# Tolerated difference between the aspect ratios of a scanned image and its page
+ASPECT_TOLERANCE = 0.03
+# Margin, as a fraction of the page size, an image may leave and still cover the page
+COVER_TOLERANCE = 0.01
+
+
+def _name(obj: Any) -> Any:
+    """
+    Returns the name of a PDF name object (e.g. /DCTDecode), or the object itself.
+    """
+    from pdfminer.pdftypes import resolve1
+
+    name = getattr(resolve1(obj), "name", obj)
+    return name.decode("latin-1") if isinstance(name, bytes) else name
+
+
+def _decode_image_stream(
+    stream: "PDFStream", size: Optional[Tuple[int, int]] = None
+) -> Optional["Image.Image"]:
+    """
+    Turns an image XObject into a PIL image without rasterizing the page:
+    JPEG and JPEG 2000 data is handed to PIL as is (JPEGs are decoded at reduced
+    scale when ``size`` is given), 8-bit RGB or gray Flate data is wrapped directly.
+    Returns None for anything else (masks, indexed or CMYK raw data, decode arrays).
+    """
+    from PIL import Image
+
+    if stream.get("ImageMask") or stream.get_any(("D", "Decode")):
+        return None
+    filters = [_name(f) for f, _ in stream.get_filters()]
+    if filters in (["DCTDecode"], ["JPXDecode"]):
+        image = Image.open(io.BytesIO(stream.get_rawdata()))
+        if size is not None:
+            image.draft("RGB", size)
+        return image
+    if filters not in ([], ["FlateDecode"]):
+        return None
+    width = stream.get_any(("W", "Width"))
+    height = stream.get_any(("H", "Height"))
+    bits = stream.get_any(("BPC", "BitsPerComponent"))
+    mode = RAW_IMAGE_MODES.get(_name(stream.get_any(("CS", "ColorSpace"))))
+    if bits != 8 or mode is None:
+        return None
+    data = stream.get_data()
+    if len(data) < width * height * mode[1]:
+        return None
+    return Image.frombytes(mode[0], (width, height), data)
+
+
+class PdfDocument:
+    """
+    A PDF parsed once and shared by metadata, text and cover extraction.
+
+    The file is opened lazily on first use, so creating a document for a file that
+    is later answered from a cache costs nothing. Use it as a context manager, or
+    call close(), to release the file handle.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._pdf = None
+        self._error: Optional[Exception] = None
+        self._page_text: Dict[int, str] = {}
+
+    @property
+    def pdf(self) -> "pdfplumber.PDF":
+        if self._error is not None:
+            raise self._error
+        if self._pdf is None:
+            import pdfplumber
+
+            try:
+                with timer("pdf_open"):
+                    self._pdf = pdfplumber.open(self.file_path)
+            except Exception as e:
+                # Remember the failure so later callers do not reparse a broken file
+                self._error = e
+                raise
+        return self._pdf
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pdf.pages)
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        info = self.pdf.metadata or {}
+        meta = {}
+        title, author = info.get("Title"), info.get("Author")
+        if title:
+            meta["title"] = title if isinstance(title, str) else None
+        if author:
+            meta["author"] = author if isinstance(author, str) else None
+        return meta
+
+    def page_text(self, index: int) -> str:
+        """
+        Text of one page from pdfplumber's character-only extraction, which skips
+        the word and layout analysis of extract_text(). Cached per page.
+        """
+        if index not in self._page_text:
+            page = self.pdf.pages[index]
+            with timer("pdf_page_text"):
+                self._page_text[index] = page.extract_text_simple() or ""
+        return self._page_text[index]
+
+    def scan_order(self, front_pages: int = 5, back_pages: int = 2) -> List[int]:
+        """
+        Page indexes in the order an ISBN is looked for: the front matter, where
+        the title and copyright pages are, then the last pages, read backwards,
+        since many books print the ISBN on the back cover.
+        """
+        count = self.page_count
+        order = list(range(min(front_pages, count)))
+        for index in range(count - 1, max(count - back_pages, 0) - 1, -1):
+            if index not in order:
+                order.append(index)
+        return order
+
+    def iter_page_texts(
+        self, front_pages: int = 5, back_pages: int = 2
+    ) -> Iterator[str]:
+        """
+        Yields page texts in scan_order(), extracting each page only when the
+        caller asks for it.
+        """
+        for index in self.scan_order(front_pages, back_pages):
+            yield self.page_text(index)
+
+    def iter_text_chunks(
+        self, front_pages: int = 5, back_pages: int = 2
+    ) -> Iterator[str]:
+        """
+        Like iter_page_texts(), for streamed scans (see utils.iter_isbns): each page
+        after the first starts with a space when it follows the previous one, so
+        an ISBN broken over the page break is still found, or with a newline,
+        which no ISBN spans, after the jump from the front to the back pages.
+        """
+        previous = None
+        for index in self.scan_order(front_pages, back_pages):
+            text = self.page_text(index)
+            if previous is not None:
+                text = (" " if index == previous + 1 else "\n") + text
+            previous = index
+            yield text
+
+    def text(self, max_pages: int = 5) -> str:
+        return "".join(self.iter_page_texts(max_pages, back_pages=0))
+
+    def title_lines(self, index: int = 0) -> List[Tuple[str, float]]:
+        """
+        Returns the lines of a page as (text, font_size) pairs, in reading order.
+        Two or three consecutive lines set in the same size are also returned
+        joined, so a title wrapped over several lines comes back whole. Rotated
+        text (e.g. margin stamps) is ignored.
+        """
+        page = self.pdf.pages[index].filter(
+            lambda obj: obj.get("object_type") != "char" or obj.get("upright", True)
+        )
+        lines = []
+        run = []
+        for line in page.extract_text_lines(return_chars=True):
+            size = round(max((c.get("size", 0) for c in line["chars"]), default=0), 1)
+            if not run or abs(run[-1][1] - size) >= 0.2:
+                run = []
+            run.append((line["text"], size))
+            lines.append(run[-1])
+            if 2 <= len(run) <= 3:
+                lines.append((" ".join(text for text, _ in run), size))
+        return lines
+
+    def render_first_page(self, resolution: int = 200) -> Optional["Image.Image"]:
+        if not self.pdf.pages:
+            return None
+        return self.pdf.pages[0].to_image(resolution=resolution).original
+
+    def thumbnail_resolution(self, size: Tuple[int, int], index: int = 0) -> int:
+        """
+        Lowest DPI at which the whole page fits a ``size`` (width, height) pixel
+        box, touching it on the constraining side.
+        """
+        page = self.pdf.pages[index]
+        scale = min(size[0] / float(page.width), size[1] / float(page.height))
+        return max(1, math.ceil(72 * scale))
+
+    def embedded_page_image(
+        self, index: int = 0, size: Optional[Tuple[int, int]] = None
+    ) -> Optional["Image.Image"]:
+        """
+        Returns the page's image when the page is a single scanned image: exactly
+        one image XObject, with the page's aspect ratio, drawn over the whole page
+        box and with nothing else (text, lines, rects, curves) painted on the
+        page. The image is read from the PDF as is instead of rasterizing the
+        page. Returns None otherwise.
+        """
+        from pdfminer.pdftypes import PDFStream, resolve1
+
+        page = self.pdf.pages[index]
+        resources = resolve1(page.page_obj.resources) or {}
+        xobjects = resolve1(resources.get("XObject")) or {}
+        streams = [resolve1(x) for x in xobjects.values()]
+        if len(streams) != 1 or not isinstance(streams[0], PDFStream):
+            return None
+        stream = streams[0]
+        if _name(stream.get("Subtype")) != "Image":
+            return None
+        width = stream.get_any(("W", "Width"))
+        height = stream.get_any(("H", "Height"))
+        rotation = (page.rotation or 0) % 360
+        # pdfplumber reports the page size after /Rotate, the image is stored before
+        page_width, page_height = float(page.width), float(page.height)
+        if rotation in (90, 270):
+            page_width, page_height = page_height, page_width
+        if not width or not height:
+            return None
+        page_aspect = page_width / page_height
+        if abs(width / height - page_aspect) > ASPECT_TOLERANCE * page_aspect:
+            return None
+        if not self._is_image_only(page):
+            return None
+        image = _decode_image_stream(stream, size)
+        if image is not None and rotation:
+            image = image.rotate(-rotation, expand=True)
+        return image
+
+    @staticmethod
+    def _is_image_only(page: "pdfplumber.page.Page") -> bool:
+        """
+        True when the page paints a single image over its whole box and nothing
+        else, so the image alone looks like the rendered page.
+        """
+        objects = page.objects
+        images = objects.get("image") or []
+        if len(images) != 1 or any(
+            objects.get(kind) for kind in objects if kind != "image"
+        ):
+            return False
+        x0, top, x1, bottom = page.bbox
+        margin_x = COVER_TOLERANCE * float(page.width)
+        margin_y = COVER_TOLERANCE * float(page.height)
+        image = images[0]
+        return (
+            float(image["x0"]) <= x0 + margin_x
+            and float(image["x1"]) >= x1 - margin_x
+            and float(image["top"]) <= top + margin_y
+            and float(image["bottom"]) >= bottom - margin_y
+        )
+
+    def render_cover(self, size: Tuple[int, int]) -> Optional["Image.Image"]:
+        """
+        Returns the first page for a thumbnail of ``size`` pixels: the embedded
+        scan of an image-only page when there is one, otherwise the page
+        rasterized at the lowest resolution that fits ``size``.
+        """
+        if not self.pdf.pages:
+            return None
+        try:
+            image = self.embedded_page_image(0, size)
+        except Exception as e:
+            logger.debug(f"Could not read the embedded page image: {e}")
+            image = None
+        if image is not None:
+            count("cover_source", method="embedded")
+            return image
+        count("cover_source", method="rasterized")
+        return self.render_first_page(self.thumbnail_resolution(size))
+
+    def close(self) -> None:
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+
+    def __enter__(self) -> "PdfDocument":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,106 @@
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable
+
+logger = logging.getLogger("bookinfo")
+
+DEFAULT_DEPTH = 3
+
+
+class CancelToken:
+    """
+    Flag handed to a background task so the UI can tell it its result is stale.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+def default_prefetch_depth() -> int:
+    """
+    Number of upcoming files to prepare ahead, from BOOKINFO_PREFETCH_DEPTH.
+    """
+    try:
+        return max(0, int(os.getenv("BOOKINFO_PREFETCH_DEPTH", DEFAULT_DEPTH)))
+    except ValueError:
+        return DEFAULT_DEPTH
+
+
+class Prefetcher:
+    """
+    Runs ``load(path)`` for the next files of a review queue on worker threads,
+    so the result is ready by the time the reviewer gets there.
+
+    schedule() is called with the queue from the current file onward. Work for
+    files that left the window (renamed, skipped, removed) is cancelled, or its
+    result discarded if it is already running.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[Path], Any],
+        depth: int | None = None,
+        workers: int = 2,
+    ):
+        self.load = load
+        self.depth = default_prefetch_depth() if depth is None else depth
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="prefetch"
+        )
+        self._futures: Dict[Path, Future] = {}
+        self._lock = threading.Lock()
+
+    def schedule(self, queue: Iterable[Path]) -> None:
+        """
+        Makes sure the current file and the next ``depth`` files are being loaded.
+        """
+        wanted = []
+        for path in queue:
+            wanted.append(Path(path))
+            if len(wanted) > self.depth:
+                break
+        with self._lock:
+            for path in list(self._futures):
+                if path not in wanted:
+                    self._futures.pop(path).cancel()
+            for path in wanted:
+                if path not in self._futures:
+                    self._futures[path] = self._executor.submit(self.load, path)
+
+    def get(self, path: Path) -> Any:
+        """
+        Returns the loaded result for the file, waiting for (or starting) the work.
+        """
+        path = Path(path)
+        with self._lock:
+            future = self._futures.get(path)
+            if future is None or future.cancelled():
+                future = self._executor.submit(self.load, path)
+                self._futures[path] = future
+        return future.result()
+
+    def cancel(self, path: Path) -> None:
+        with self._lock:
+            future = self._futures.pop(Path(path), None)
+        if future is not None:
+            future.cancel()
+
+    def clear(self) -> None:
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+
+    def shutdown(self) -> None:
+        self.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,179 @@
+import re
+from difflib import SequenceMatcher
+from typing import Optional, Dict, Any, List, Set
+
+from utils import clean_title_from_filename, normalize_title, title_tokens, to_isbn13
+
+# Weights of the evidence features in the confidence. A feature the evidence
+# cannot judge (no embedded author, no page text...) is left out of the mean.
+WEIGHTS = {"title": 0.6, "author": 0.2, "text": 0.1, "year": 0.1}
+# Title lines of the first page compared with candidate titles
+MAX_TITLE_LINES = 3
+# A candidate title that starts a longer reference (followed by a subtitle, series
+# or author names) scores at least this
+PREFIX_TITLE_SCORE = 0.85
+_YEAR_REGEX = re.compile(r"(?<!\d)(1[5-9]\d\d|20\d\d)(?!\d)")
+
+
+def _surnames(authors: List[str]) -> Set[str]:
+    """
+    Last words of the author names, the part every spelling of a name shares.
+    """
+    names = set()
+    for author in authors:
+        words = title_tokens(author)
+        if words:
+            names.add(words[-1])
+    return names
+
+
+class EvidenceProfile:
+    """
+    The evidence of one file prepared for scoring any number of candidates:
+    title references are normalized once and loaded into SequenceMatchers (which
+    cache their analysis of the reference), token sets and years are built once.
+    """
+
+    def __init__(self, evidence: Dict[str, Any]):
+        meta = evidence.get("metadata") or {}
+        self.isbns = {
+            isbn13
+            for key in ("filename_isbns", "metadata_isbns", "text_isbns")
+            for isbn13 in map(to_isbn13, evidence.get(key) or [])
+            if isbn13
+        }
+        references = [
+            meta.get("title"),
+            evidence.get("filename_title"),
+            clean_title_from_filename(evidence.get("filename") or ""),
+        ] + list(evidence.get("title_lines") or [])[:MAX_TITLE_LINES]
+        self.references = [
+            r for r in dict.fromkeys(normalize_title(r) for r in references if r) if r
+        ]
+        self._matchers = []
+        for reference in self.references:
+            matcher = SequenceMatcher(None, autojunk=False)
+            matcher.set_seq2(reference)
+            self._matchers.append(matcher)
+        self.author_tokens = set(title_tokens(meta.get("author") or ""))
+        page_text = " ".join(
+            [evidence.get("text") or ""] + list(evidence.get("title_lines") or [])
+        )
+        self.text_tokens = set(title_tokens(page_text))
+        self.context_tokens = self.text_tokens | set(
+            title_tokens(evidence.get("filename") or "")
+        )
+        self.years = set(
+            _YEAR_REGEX.findall(
+                " ".join([evidence.get("filename") or "", meta.get("title") or ""])
+            )
+        ) | set(_YEAR_REGEX.findall(evidence.get("text") or ""))
+        self._title_scores: Dict[str, float] = {}
+
+    def title_score(self, title: str) -> Optional[float]:
+        """
+        Best similarity of a normalized candidate title with any reference, or
+        None without references. Scores are memoized: ISBN results often repeat
+        the same title.
+        """
+        if not self._matchers:
+            return None
+        if title in self._title_scores:
+            return self._title_scores[title]
+        best = 0.0
+        for reference, matcher in zip(self.references, self._matchers):
+            if len(title) > 5 and f"{reference} ".startswith(f"{title} "):
+                best = max(
+                    best,
+                    PREFIX_TITLE_SCORE
+                    + (1 - PREFIX_TITLE_SCORE) * len(title) / len(reference),
+                )
+            matcher.set_seq1(title)
+            # The cheap upper bounds skip most full comparisons
+            if matcher.real_quick_ratio() <= best or matcher.quick_ratio() <= best:
+                continue
+            best = max(best, matcher.ratio())
+        self._title_scores[title] = best
+        return best
+
+    def features(self, candidate: Dict[str, Any]) -> Dict[str, float]:
+        """
+        Scores each feature the evidence can judge in 0..1.
+        """
+        title = candidate["title"]
+        titles = [normalize_title(title)]
+        if candidate.get("subtitle"):
+            titles.append(normalize_title(f"{title} {candidate['subtitle']}"))
+        features = {}
+        scores = [self.title_score(t) for t in titles]
+        if scores[0] is not None:
+            features["title"] = max(scores)
+
+        surnames = _surnames(candidate.get("authors_or_editors") or [])
+        if self.author_tokens and surnames:
+            features["author"] = 1.0 if surnames & self.author_tokens else 0.0
+        elif surnames & self.context_tokens:
+            # A surname in the filename or on the page can only raise the score:
+            # most filenames and title pages do not name the author at all
+            features["author"] = 1.0
+
+        if self.text_tokens:
+            words = title_tokens(title)
+            if words:
+                features["text"] = sum(w in self.text_tokens for w in words) / len(
+                    words
+                )
+
+        if candidate.get("year_of_publication") in self.years:
+            features["year"] = 1.0
+        return features
+
+    def confidence(self, candidate: Dict[str, Any]) -> float:
+        """
+        0..1 confidence that the candidate is the book in the file. A candidate
+        carrying an ISBN found in the file scores 1.0; otherwise the weighted mean
+        of the features the evidence can judge.
+        """
+        if not candidate.get("title"):
+            return 0.0
+        isbns = {
+            to_isbn13(isbn)
+            for isbn in (candidate.get("isbn_10"), candidate.get("isbn_13"))
+            if isbn
+        }
+        if isbns & self.isbns:
+            return 1.0
+        features = self.features(candidate)
+        if "title" not in features and "text" not in features:
+            # Author and year agreements alone say little about the book
+            return 0.0
+        total = sum(WEIGHTS[name] for name in features)
+        score = sum(WEIGHTS[name] * value for name, value in features.items())
+        return round(score / total, 3)
+
+
+def rank_candidates(
+    candidates: List[Dict[str, Any]], evidence: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """
+    Returns copies of the candidates (parse_google_books_item results) with a
+    "confidence" key, best first. Ties keep Google's order.
+    """
+    profile = EvidenceProfile(evidence)
+    ranked = [
+        dict(candidate, confidence=profile.confidence(candidate))
+        for candidate in candidates
+    ]
+    ranked.sort(key=lambda candidate: candidate["confidence"], reverse=True)
+    return ranked
+
+
+def ensure_ranked(
+    results: List[Dict[str, Any]], evidence: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """
+    Ranks results cached before candidates were ranked; others are returned as is.
+    """
+    if all("confidence" in result for result in results):
+        return results
+    return rank_candidates(results, evidence)
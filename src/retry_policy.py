@@ -0,0 +1,245 @@
+import functools
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from errors import BookLookupError, QuotaExceededError, TransientLookupError
+from instrumentation import count, timer
+
+logger = logging.getLogger("bookinfo")
+
+RETRY_ATTEMPTS = 4
+RETRY_MAX_WAIT = 30.0  # seconds, for the jittered exponential backoff
+RETRY_AFTER_CAP = 120.0  # Retry-After delays from the server are capped to this
+FAILURE_THRESHOLD = 5  # consecutive transient failures that open the circuit
+COOLDOWN = 30.0  # first pause once the circuit opens, doubled while failures go on
+MAX_COOLDOWN = 600.0
+QUOTA_PAUSE = 3600.0  # pause after quota exhaustion when the server gives no hint
+DEFAULT_RATE = 5.0  # Google Books requests per second
+DEFAULT_BURST = 5
+
+
+class CircuitBreaker:
+    """
+    Process-wide switch that pauses every lookup thread when Google Books keeps
+    failing, instead of letting each worker hammer the API with its own retries.
+
+    After FAILURE_THRESHOLD consecutive transient failures (or a Retry-After from
+    the server) all callers of before_call() sleep until the pause is over; the
+    pause doubles each time the failures go on. Once the quota is exhausted,
+    before_call() raises QuotaExceededError until the quota pause ends.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        cooldown: float = COOLDOWN,
+        max_cooldown: float = MAX_COOLDOWN,
+    ):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._cooldown = self.base_cooldown
+            self._paused_until = 0.0
+            self._quota_until = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return time.monotonic() < self._paused_until
+
+    def before_call(self) -> None:
+        """
+        Blocks while the circuit is open; raises once the quota is exhausted.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._quota_until:
+                    count("quota_rejections")
+                    raise QuotaExceededError(
+                        "Google Books quota exhausted; lookups paused for "
+                        f"{self._quota_until - now:.0f}s"
+                    )
+                delay = self._paused_until - now
+            if delay <= 0:
+                return
+            with timer("breaker_wait"):
+                time.sleep(delay)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._cooldown = self.base_cooldown
+
+    def record_failure(self, error: BookLookupError) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if isinstance(error, QuotaExceededError):
+                pause = error.retry_after or QUOTA_PAUSE
+                self._quota_until = max(self._quota_until, now + pause)
+                count("quota_exhausted")
+                logger.error(f"Google Books quota exhausted, stopping lookups: {error}")
+                return
+            if not isinstance(error, TransientLookupError):
+                return
+            if error.retry_after:
+                # The server said when to come back: hold every worker until then
+                self._paused_until = max(
+                    self._paused_until, now + min(error.retry_after, RETRY_AFTER_CAP)
+                )
+                count("retry_after_pauses")
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._paused_until = max(self._paused_until, now + self._cooldown)
+                count("breaker_opens")
+                logger.warning(
+                    f"{self._failures} Google Books failures in a row, "
+                    f"pausing lookups for {self._cooldown:.0f}s"
+                )
+                self._failures = 0
+                self._cooldown = min(self._cooldown * 2, self.max_cooldown)
+
+
+class TokenBucket:
+    """
+    Token bucket limiting the rate of Google Books requests across every thread,
+    lookup path and event loop of the process. Callers block in acquire().
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self, tokens: float) -> float:
+        """
+        Takes the tokens if available and returns 0, otherwise returns the number
+        of seconds to wait. Requests larger than the bucket (a batch of queries)
+        go through once it is full and leave it in debt.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            needed = min(tokens, self.capacity)
+            if self._tokens >= needed:
+                self._tokens -= tokens
+                return 0.0
+            return (needed - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1) -> None:
+        delay = self._take(tokens)
+        if delay <= 0:
+            return
+        with timer("rate_limit_wait"):
+            while delay > 0:
+                time.sleep(delay)
+                delay = self._take(tokens)
+
+
+_breaker: Optional[CircuitBreaker] = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """
+    Returns the process-wide breaker. BOOKINFO_BREAKER_THRESHOLD and
+    BOOKINFO_BREAKER_COOLDOWN override the failure count and first pause.
+    """
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker(
+                    failure_threshold=int(
+                        os.getenv("BOOKINFO_BREAKER_THRESHOLD", FAILURE_THRESHOLD)
+                    ),
+                    cooldown=float(os.getenv("BOOKINFO_BREAKER_COOLDOWN", COOLDOWN)),
+                )
+    return _breaker
+
+
+_rate_limiter: Optional[TokenBucket] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> Optional[TokenBucket]:
+    """
+    Returns the process-wide rate limiter, or None when BOOKINFO_RATE_LIMIT is "0".
+    BOOKINFO_RATE_LIMIT sets requests per second and BOOKINFO_RATE_BURST the
+    bucket size.
+    """
+    global _rate_limiter
+    rate = float(os.getenv("BOOKINFO_RATE_LIMIT", DEFAULT_RATE))
+    if rate <= 0:
+        return None
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = TokenBucket(
+                    rate=rate,
+                    capacity=float(os.getenv("BOOKINFO_RATE_BURST", DEFAULT_BURST)),
+                )
+    return _rate_limiter
+
+
+def _wait_for_retry(retry_state) -> float:
+    """
+    Jittered exponential backoff, but never shorter than the server's Retry-After.
+    """
+    from tenacity import wait_random_exponential
+
+    backoff = wait_random_exponential(multiplier=1, max=RETRY_MAX_WAIT)(retry_state)
+    error = retry_state.outcome.exception()
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after:
+        return max(backoff, min(retry_after, RETRY_AFTER_CAP))
+    return backoff
+
+
+def _log_retry(retry_state) -> None:
+    error = retry_state.outcome.exception()
+    count("retries", error=type(error).__name__)
+    logger.warning(
+        f"Google Books lookup failed ({error}), retrying in "
+        f"{retry_state.next_action.sleep:.1f}s "
+        f"(attempt {retry_state.attempt_number}/{RETRY_ATTEMPTS})"
+    )
+
+
+def lookup_retry(func: Callable) -> Callable:
+    """
+    Decorator retrying ``func`` on transient failures only, then re-raising the
+    last classified error. tenacity is imported on the first call.
+    """
+    retrying = None
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        nonlocal retrying
+        if retrying is None:
+            from tenacity import Retrying, retry_if_exception_type, stop_after_attempt
+
+            retrying = Retrying(
+                retry=retry_if_exception_type(TransientLookupError),
+                stop=stop_after_attempt(RETRY_ATTEMPTS),
+                wait=_wait_for_retry,
+                before_sleep=_log_retry,
+                reraise=True,
+            )
+        # A copy per call keeps the retry state of concurrent callers apart
+        return retrying.copy()(func, *args, **kwargs)
+
+    return wrapper
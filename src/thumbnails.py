@@ -0,0 +1,203 @@
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional, Tuple
+
+from instrumentation import count, timer
+from utils import default_cache_dir, partial_content_hash
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger("bookinfo")
+
+# Twice the 100x150 cover widgets, so thumbnails stay sharp on HiDPI screens
+THUMBNAIL_SIZE = (200, 300)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_FORMAT = "JPEG"
+DEFAULT_QUALITY = 80
+EXTENSIONS = {"JPEG": ".jpg", "WEBP": ".webp"}
+
+
+def to_displayable(image: "Image.Image") -> "Image.Image":
+    """
+    Converts any PIL mode (palette, CMYK, 16-bit, alpha...) to RGB or L, which
+    JPEG and WebP can store. Transparent areas become white.
+    """
+    if image.mode in ("RGB", "L"):
+        return image
+    if image.mode in ("RGBA", "LA", "P", "PA"):
+        from PIL import Image
+
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+class ThumbnailStore:
+    """
+    Directory of small cover thumbnails keyed by file content (see
+    utils.partial_content_hash), so identical books share one image, renamed or
+    moved files keep theirs, and different files never collide.
+
+    Covers are downscaled to ``size`` and saved as compressed JPEG or WebP. The
+    total size of the directory is capped; the least recently used thumbnails
+    (by file modification time, refreshed on every hit) are removed first.
+    Safe to use from several threads.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        size: Tuple[int, int] = THUMBNAIL_SIZE,
+        image_format: str = DEFAULT_FORMAT,
+        quality: int = DEFAULT_QUALITY,
+    ):
+        self.directory = (
+            Path(directory) if directory else default_cache_dir() / "thumbnails"
+        )
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.size = size
+        self.image_format = image_format.upper()
+        if self.image_format not in EXTENSIONS:
+            raise ValueError(f"Unsupported thumbnail format: {image_format}")
+        self.quality = quality
+        self._lock = threading.Lock()
+        self._total = sum(size for _, size, _ in self._entries())
+
+    def _entries(self):
+        """
+        Yields (path, size, mtime) for every stored thumbnail.
+        """
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.startswith("."):
+                stat = entry.stat()
+                yield Path(entry.path), stat.st_size, stat.st_mtime
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f"{key}{EXTENSIONS[self.image_format]}"
+
+    def get(self, file_path: str) -> Optional[str]:
+        """
+        Returns the stored thumbnail for the file, or None.
+        """
+        path = self.path_for(partial_content_hash(file_path))
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            return None
+        return str(path)
+
+    def put(self, file_path: str, image: "Image.Image") -> str:
+        """
+        Downscales the image, stores it for the file and returns its path.
+        """
+        from PIL import Image
+
+        path = self.path_for(partial_content_hash(file_path))
+        image = to_displayable(image)
+        image.thumbnail(self.size, Image.Resampling.LANCZOS)
+        tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        with timer("thumbnail_write", format=self.image_format.lower()):
+            image.save(tmp_path, self.image_format, quality=self.quality, optimize=True)
+        written = tmp_path.stat().st_size
+        with self._lock:
+            # Overwriting a thumbnail replaces its bytes instead of adding to them
+            try:
+                replaced = path.stat().st_size
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+            self._total += written - replaced
+            over = self._total > self.max_bytes
+        if over:
+            self.evict()
+        return str(path)
+
+    def get_or_create(
+        self, file_path: str, render: Callable[[], Optional["Image.Image"]]
+    ) -> Optional[str]:
+        """
+        Returns the file's thumbnail, calling ``render`` to produce the cover
+        image only when none is stored yet. Returns None if rendering gave nothing.
+        """
+        path = self.get(file_path)
+        if path is not None:
+            count("thumbnail_cache", result="hit")
+            return path
+        count("thumbnail_cache", result="miss")
+        image = render()
+        if image is None:
+            return None
+        return self.put(file_path, image)
+
+    def evict(self) -> int:
+        """
+        Removes least recently used thumbnails until the directory fits the cap.
+        Returns the number of files removed.
+        """
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for path, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+            self._total = total
+        if removed:
+            logger.info(f"Evicted {removed} cover thumbnails")
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            for path, _, _ in self._entries():
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            self._total = 0
+
+
+_thumbnail_store: Optional[ThumbnailStore] = None
+_thumbnail_store_lock = threading.Lock()
+
+
+def get_thumbnail_store() -> ThumbnailStore:
+    """
+    Returns the shared thumbnail store configured from the environment.
+
+    BOOKINFO_THUMBNAIL_DIR overrides the location (default: "thumbnails" in the
+    cache directory), BOOKINFO_THUMBNAIL_MAX_MB caps its total size and
+    BOOKINFO_THUMBNAIL_FORMAT selects JPEG or WEBP.
+    """
+    global _thumbnail_store
+    if _thumbnail_store is None:
+        with _thumbnail_store_lock:
+            if _thumbnail_store is None:
+                directory = os.getenv("BOOKINFO_THUMBNAIL_DIR")
+                _thumbnail_store = ThumbnailStore(
+                    directory=Path(directory).expanduser() if directory else None,
+                    max_bytes=int(
+                        float(
+                            os.getenv(
+                                "BOOKINFO_THUMBNAIL_MAX_MB",
+                                DEFAULT_MAX_BYTES / (1024 * 1024),
+                            )
+                        )
+                        * 1024
+                        * 1024
+                    ),
+                    image_format=os.getenv("BOOKINFO_THUMBNAIL_FORMAT", DEFAULT_FORMAT),
+                )
+    return _thumbnail_store
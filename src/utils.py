@@ -1,11 +1,17 @@
+import hashlib
+import os
 import re
+import sys
 from pathlib import Path
-from typing import Optional, Tuple, List
+from typing import Optional, Tuple, List, Iterable, Iterator
+
+# Drops the separators allowed inside an ISBN without going through the regex engine
+_ISBN_SEPARATORS = str.maketrans("", "", "- ")
 
 
 # Accept ISBNs with or without dashes
 def _normalize_isbn(isbn: str) -> str:
-    return re.sub(r"[- ]", "", isbn).upper()
+    return isbn.translate(_ISBN_SEPARATORS).upper()
 
 
 # More structurally explicit regexes
@@ -22,25 +28,164 @@ ISBN10_REGEX = re.compile(
 # ISBN-13: 978/979, then 10 digits (with optional separators) OR 13 consecutive digits starting with 978/979
 ISBN13_REGEX = re.compile(r"(?<!\d)(97[89](?:[\- ]*\d){10}|97[89]\d{10})(?!\d)", re.UNICODE)
 
+# Both kinds in one sweep. The ISBN-13 branch is tried first at each position, and
+# a match is consumed whole, so the tail of an ISBN-13 is never also read as an ISBN-10.
+ISBN_REGEX = re.compile(
+    r"(?<!\d)"
+    r"(?:97[89](?:[\- ]*\d){10}"  # ISBN-13
+    r"|\d(?:[\- ]*\d){8}[\- ]*[\dXx])"  # ISBN-10
+    r"(?!\d)",
+    re.UNICODE,
+)
+# Longest text an ISBN-10/13 can span with separators, used to carry matches
+# across the boundary between two streamed chunks
+_ISBN_MAX_SPAN = 64
+
+
+def is_valid_isbn10(isbn: str) -> bool:
+    """
+    Checks the ISBN-10 checksum: sum of digit * weight (10..1) must be divisible by 11.
+    Only the last character may be X (= 10).
+    """
+    if len(isbn) != 10 or not isbn[:9].isdigit():
+        return False
+    if not (isbn[9].isdigit() or isbn[9] == "X"):
+        return False
+    total = sum((10 - i) * int(c) for i, c in enumerate(isbn[:9]))
+    total += 10 if isbn[9] == "X" else int(isbn[9])
+    return total % 11 == 0
+
+
+def is_valid_isbn13(isbn: str) -> bool:
+    """
+    Checks the ISBN-13 (EAN-13) checksum and the 978/979 Bookland prefix.
+    """
+    if len(isbn) != 13 or not isbn.isdigit() or isbn[:3] not in ("978", "979"):
+        return False
+    total = sum(int(c) * (1 if i % 2 == 0 else 3) for i, c in enumerate(isbn))
+    return total % 10 == 0
+
+
+def isbn10_to_isbn13(isbn10: str) -> str:
+    body = "978" + isbn10[:9]
+    total = sum(int(c) * (1 if i % 2 == 0 else 3) for i, c in enumerate(body))
+    return body + str((10 - total % 10) % 10)
+
+
+def to_isbn13(isbn: str) -> Optional[str]:
+    """
+    Returns the canonical ISBN-13 for a normalized ISBN-10 or ISBN-13,
+    or None if the checksum is wrong.
+    """
+    if len(isbn) == 10 and is_valid_isbn10(isbn):
+        return isbn10_to_isbn13(isbn)
+    if len(isbn) == 13 and is_valid_isbn13(isbn):
+        return isbn
+    return None
+
+
+def iter_isbn_matches(text: str, pos: int = 0) -> Iterator[Tuple[str, int, int]]:
+    """
+    Yields (normalized_isbn, start, end) for every checksum-valid ISBN-10/13 in the
+    text from ``pos`` on, in order of appearance, with a single regex sweep.
+    """
+    search = ISBN_REGEX.search
+    while True:
+        match = search(text, pos)
+        if match is None:
+            return
+        isbn = _normalize_isbn(match.group())
+        if is_valid_isbn13(isbn) if len(isbn) == 13 else is_valid_isbn10(isbn):
+            yield isbn, match.start(), match.end()
+            pos = match.end()
+        else:
+            # Digits printed right before an ISBN-13 can pass for an ISBN-10 that
+            # swallows its first digits; look again from the next position
+            pos = match.start() + 1
+
+
+def iter_isbns(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Scans text that arrives in pieces (e.g. one PDF page at a time) and yields each
+    checksum-valid ISBN once, as a canonical ISBN-13, as soon as it is seen.
+
+    Chunks are only pulled as needed, so a caller that stops after the first hit
+    never extracts the rest. A number split across two chunks is still found.
+    """
+    seen = set()
+    text = ""
+    pos = 0
+    for chunk in chunks:
+        # Forget the scanned text, keeping one character for the look-behind
+        keep = max(pos - 1, 0)
+        text = text[keep:] + chunk
+        pos -= keep
+        # A match ending this close to the end may still change with the next chunk
+        cutoff = len(text) - _ISBN_MAX_SPAN
+        for isbn, start, end in iter_isbn_matches(text, pos):
+            if end > cutoff:
+                pos = start
+                break
+            pos = end
+            isbn13 = to_isbn13(isbn)
+            if isbn13 not in seen:
+                seen.add(isbn13)
+                yield isbn13
+        else:
+            pos = max(pos, cutoff - _ISBN_MAX_SPAN)
+    for isbn, _, _ in iter_isbn_matches(text, pos):
+        isbn13 = to_isbn13(isbn)
+        if isbn13 not in seen:
+            seen.add(isbn13)
+            yield isbn13
+
 
-def extract_isbns(text: str) -> Tuple[List[str], List[str]]:
+def find_first_isbn(chunks: Iterable[str]) -> Optional[str]:
     """
-    Extract ISBN-10 and ISBN-13 numbers from a given text, allowing for dashes or spaces.
-    Returns a tuple of (isbn10_list, isbn13_list), normalized (no dashes/spaces, uppercase X).
+    Returns the first checksum-valid ISBN (as ISBN-13) in streamed text, or None.
+    Stops reading ``chunks`` as soon as one is found.
     """
-    raw_isbn10s = ISBN10_REGEX.findall(text)
-    raw_isbn13s = ISBN13_REGEX.findall(text)
-    isbn10s = []
-    isbn13s = []
-    for raw in raw_isbn10s:
-        norm = _normalize_isbn(raw)
-        if len(norm) == 10:
-            isbn10s.append(norm)
-    for raw in raw_isbn13s:
-        norm = _normalize_isbn(raw)
-        if len(norm) == 13:
-            isbn13s.append(norm)
-    return isbn10s, isbn13s
+    return next(iter_isbns(chunks), None)
+
+
+# "ISBN", "ISBN-13:", "ISBN 10" ... right before the number
+ISBN_LABEL_REGEX = re.compile(r"isbn(?:[\s\-]?1[03])?[\s:#.]*$", re.IGNORECASE)
+# Phrases found on copyright pages, where the book's own ISBN is printed
+COPYRIGHT_REGEX = re.compile(
+    r"©|\(c\)|copyright|all rights reserved|published by|printed in"
+    r"|library of congress|cataloging",
+    re.IGNORECASE,
+)
+
+
+def _score_isbn_context(text: str, start: int, end: int) -> float:
+    score = 1.0
+    if ISBN_LABEL_REGEX.search(text[max(0, start - 24) : start]):
+        score += 3.0
+    if COPYRIGHT_REGEX.search(text[max(0, start - 400) : end + 400]):
+        score += 1.0
+    return score
+
+
+def rank_isbns(text: str) -> List[str]:
+    """
+    Returns the checksum-valid ISBNs in the text as canonical ISBN-13s,
+    deduplicated (an ISBN-10 and its ISBN-13 count as one) and ranked best-first.
+
+    Each occurrence scores higher when an "ISBN" label precedes it or when it sits
+    near copyright-page wording; repeated occurrences add up, and ties keep the
+    order of first appearance.
+    """
+    scores = {}
+    first_seen = {}
+    for isbn, start, end in iter_isbn_matches(text):
+        isbn13 = to_isbn13(isbn)
+        scores[isbn13] = scores.get(isbn13, 0.0) + _score_isbn_context(text, start, end)
+        first_seen.setdefault(isbn13, start)
+    return sorted(scores, key=lambda isbn: (-scores[isbn], first_seen[isbn]))
+
+
+_TITLE_SEPARATORS_REGEX = re.compile(r"[_\-\s]+")
 
 
 def clean_title_from_filename(filename: str) -> str:
@@ -54,12 +199,126 @@ def clean_title_from_filename(filename: str) -> str:
     name = ISBN13_REGEX.sub("", name)
     # Remove all ISBN-10s (with or without dashes/spaces) from anywhere in the name
     name = ISBN10_REGEX.sub("", name)
-    # Remove any leftover leading/trailing separators or whitespace
-    name = re.sub(r"[_\-]+", " ", name)
-    name = re.sub(r"\s+", " ", name).strip()
+    # Turn runs of underscores, dashes and whitespace into single spaces
+    name = _TITLE_SEPARATORS_REGEX.sub(" ", name).strip()
     return name
 
 
+def normalize_title(text: str) -> str:
+    """
+    Lowercases a title and turns punctuation and whitespace runs into single spaces.
+    """
+    return re.sub(r"[\W_]+", " ", text).strip().lower()
+
+
+# Words left out of title tokens: too common to tell books apart
+STOPWORDS = {"a", "an", "and", "by", "de", "for", "in", "of", "on", "the", "to"}
+
+
+def title_tokens(text: str) -> List[str]:
+    """
+    Returns the distinct searchable words of a title or author name.
+    """
+    return list(
+        dict.fromkeys(
+            word
+            for word in normalize_title(text).split()
+            if len(word) > 1 and word not in STOPWORDS
+        )
+    )
+
+
+def score_title_line(text: str, size: float, max_size: float) -> float:
+    """
+    Scores how likely a line of a PDF page is the book title: large type relative
+    to the rest of the page, mostly capitalized words and a title-like length.
+    Lines with digits or too short to search for score 0; single words (headings
+    such as "Contents") get half the capitalization score.
+    """
+    words = text.split()
+    if len(text) <= 5 or len(text) > 150 or any(c.isdigit() for c in text):
+        return 0.0
+    size_score = size / max_size if max_size else 0.5
+    initials = [w[0] for w in words if w[0].isalpha()]
+    title_case = bool(initials) and sum(c.isupper() for c in initials) >= 0.6 * len(
+        initials
+    )
+    capitalized = (1.0 if title_case else 0.0) * min(len(words), 2) / 2
+    length_score = 1.0 if 10 <= len(text) <= 100 else 0.5
+    return round(2 * size_score + capitalized + length_score, 3)
+
+
+def rank_title_lines(lines: List[Tuple[str, float]]) -> List[str]:
+    """
+    Returns the candidate title lines, given as (text, font_size) pairs,
+    deduplicated and ranked best-first, longer text first on equal scores. Lines
+    that cannot be a title are dropped.
+    """
+    max_size = max((size for _, size in lines), default=0)
+    scores = {}
+    texts = {}
+    for text, size in lines:
+        text = " ".join(text.split())
+        key = normalize_title(text)
+        score = score_title_line(text, size, max_size)
+        if score and key and score > scores.get(key, 0):
+            scores[key] = score
+            texts[key] = text
+    return [texts[key] for key in sorted(scores, key=lambda k: (-scores[k], -len(k)))]
+
+
+def build_new_filename_from_info(info: dict, original_extension: str) -> str:
+    """Builds the new filename based on book info and original extension."""
+    isbn10 = info.get("isbn_10")
+    title = info.get("title") or "UnknownTitle"
+    subtitle = info.get("subtitle", "")  # Subtitle is optional
+    authors_list = info.get("authors_or_editors")
+
+    first_author = "UnknownAuthor"
+    if authors_list and isinstance(authors_list, list) and len(authors_list) > 0:
+        first_author = authors_list[0]
+
+    filename_parts = []
+    if isbn10:
+        filename_parts.append(isbn10)
+    if subtitle:
+        title = f"{title}; {subtitle}"
+    filename_parts.extend([title, first_author])
+
+    base_name = " - ".join(filename_parts)
+    base_name = f"{base_name}{original_extension}"
+
+    # Sanitize filename (remove characters not allowed in macOS filenames)
+    invalid_chars = '\\/:*?"<>|'
+    sanitized_name = "".join(c for c in base_name if c not in invalid_chars)
+    return sanitized_name.strip()
+
+
+# Subfolder that move_to_completed moves renamed files into
+COMPLETED_DIR = "completed"
+
+
+def move_to_completed(file_path: Path, new_filename: str) -> Path:
+    """
+    Renames the file to ``new_filename`` and moves it into a "completed" subfolder
+    next to it. Returns the new path.
+    """
+    # Create completed subfolder in the same directory as the original file
+    completed_dir = file_path.parent / COMPLETED_DIR
+    completed_dir.mkdir(exist_ok=True)
+
+    # The new file will be placed in the completed folder
+    new_file_path = completed_dir / new_filename
+
+    # First rename the file
+    temp_renamed_file = file_path.with_name(new_filename)
+    file_path.rename(temp_renamed_file)
+
+    # Then move the renamed file to completed folder
+    temp_renamed_file.rename(new_file_path)
+    return new_file_path
+
+
 def is_pdf(file_path: str) -> bool:
     return Path(file_path).suffix.lower() == ".pdf"
 
@@ -75,3 +334,43 @@ def validate_file_path(file_path: str) -> bool:
 
 def validate_api_key(api_key: Optional[str]) -> bool:
     return bool(api_key and isinstance(api_key, str) and len(api_key) > 0)
+
+
+def default_cache_dir() -> Path:
+    """
+    Returns the per-user cache directory for BookInfo.
+    BOOKINFO_CACHE_DIR overrides the platform default.
+    """
+    override = os.getenv("BOOKINFO_CACHE_DIR")
+    if override:
+        return Path(override).expanduser()
+    if sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches"
+    elif os.name == "nt":
+        base = Path(os.getenv("LOCALAPPDATA") or Path.home() / "AppData" / "Local")
+    else:
+        base = Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache")
+    return base / "BookInfo"
+
+
+def file_fingerprint(file_path: str) -> Tuple[int, float]:
+    """
+    Returns (size, mtime) for a file, the cheap identity used by the caches.
+    """
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime
+
+
+def partial_content_hash(file_path: str, chunk_size: int = 64 * 1024) -> str:
+    """
+    Hashes the file size plus its first and last ``chunk_size`` bytes.
+    Fast enough for large PDFs while still recognizing renamed or moved files.
+    """
+    size = os.path.getsize(file_path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(file_path, "rb") as f:
+        digest.update(f.read(chunk_size))
+        if size > chunk_size:
+            f.seek(max(size - chunk_size, chunk_size))
+            digest.update(f.read(chunk_size))
+    return digest.hexdigest()
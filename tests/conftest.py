@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+
+class Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Replaces time.time with a clock that only moves when advance() is called.
+    """
+    fake = Clock()
+    monkeypatch.setattr(time, "time", fake)
+    return fake
+
+
+class FakeClient:
+    """
+    Stands in for google_client.GoogleBooksClient and records the queries sent.
+    """
+
+    def __init__(self, answers=None):
+        self.answers = answers or {}
+        self.queries = []
+
+    def list_volumes(self, query, max_results=5):
+        self.queries.append(query)
+        return self.answers.get(query, [])
+
+    def list_volumes_batch(self, queries, max_results=5):
+        self.queries.extend(queries)
+        return {query: self.answers.get(query, []) for query in queries}
+
+
+@pytest.fixture
+def caches(tmp_path, monkeypatch):
+    """
+    Points the shared caches at a fresh directory, without the local index and
+    the rate limiter.
+    """
+    import file_cache
+    import lookup_cache
+
+    monkeypatch.setenv("BOOKINFO_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("BOOKINFO_LOCAL_INDEX", "0")
+    monkeypatch.setenv("BOOKINFO_RATE_LIMIT", "0")
+    monkeypatch.setattr(lookup_cache, "_lookup_cache", None)
+    monkeypatch.setattr(file_cache, "_file_cache", None)
+    yield
+    for module, name in ((lookup_cache, "_lookup_cache"), (file_cache, "_file_cache")):
+        cache = getattr(module, name)
+        if cache is not None:
+            cache.close()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """
+    A FakeClient answering every Google Books request made through core.
+    """
+    import core
+
+    fake = FakeClient()
+    monkeypatch.setattr(core, "get_client", lambda api_key: fake)
+    return fake
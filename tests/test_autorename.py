@@ -0,0 +1,57 @@
+import json
+
+from autorename import run
+from cli import iter_input_paths
+
+ITEM = {
+    "id": "xyz",
+    "volumeInfo": {
+        "title": "Signal Processing",
+        "authors": ["Ann Author"],
+        "publishedDate": "1992",
+        "industryIdentifiers": [{"type": "ISBN_13", "identifier": "9780306406157"}],
+    },
+}
+
+
+def make_tree(tmp_path):
+    root = tmp_path / "books"
+    (root / "shelf").mkdir(parents=True)
+    (root / "shelf" / "9780306406157.pdf").write_bytes(b"%PDF-1.4")
+    (root / "notes.txt").write_text("not a book")
+    return root
+
+
+def test_recursive_walk_skips_completed_folders(tmp_path):
+    root = make_tree(tmp_path)
+    (root / "shelf" / "completed").mkdir()
+    (root / "shelf" / "completed" / "Done (2001).pdf").write_bytes(b"%PDF-1.4")
+    assert list(iter_input_paths([str(root)], recursive=True)) == [
+        str(root / "shelf" / "9780306406157.pdf")
+    ]
+
+
+def test_second_run_leaves_renamed_files_alone(tmp_path, caches, client):
+    client.answers["isbn:9780306406157"] = [ITEM]
+    root = make_tree(tmp_path)
+    plan, review = tmp_path / "plan.jsonl", tmp_path / "review.jsonl"
+
+    def autorename():
+        return run(
+            iter_input_paths([str(root)], recursive=True),
+            str(plan),
+            str(review),
+            api_key="key",
+            parse_workers=1,
+        )
+
+    assert autorename() == {"rename": 1, "review": 0, "error": 0}
+    target = json.loads(plan.read_text())["target"]
+    assert (root / "shelf" / "completed").is_dir()
+    assert target.startswith(str(root / "shelf" / "completed"))
+
+    assert autorename() == {"rename": 0, "review": 0, "error": 0}
+    assert not (root / "shelf" / "completed" / "completed").exists()
+    assert [p.name for p in (root / "shelf" / "completed").iterdir()] == [
+        target.rsplit("/", 1)[1]
+    ]
@@ -0,0 +1,51 @@
+import argparse
+import json
+
+import cli
+from cli import end_partial_line, load_done_paths, run_batch
+
+DONE = {"file_path": "a.pdf", "results": [{"title": "A"}], "error": None}
+
+
+def batch_args(output, paths):
+    return argparse.Namespace(
+        paths=paths,
+        recursive=False,
+        resume=str(output),
+        output=str(output),
+        workers=1,
+        lookup_workers=1,
+        batch_isbn=False,
+        strategy="waterfall",
+    )
+
+
+def test_end_partial_line(tmp_path):
+    path = tmp_path / "out.jsonl"
+    end_partial_line(str(path))
+    assert not path.exists()
+    path.write_text("")
+    end_partial_line(str(path))
+    assert path.read_text() == ""
+    path.write_text('{"a": 1}\n')
+    end_partial_line(str(path))
+    assert path.read_text() == '{"a": 1}\n'
+    path.write_text('{"a": 1}\n{"b"')
+    end_partial_line(str(path))
+    assert path.read_text() == '{"a": 1}\n{"b"\n'
+
+
+def test_resume_after_interrupted_write(tmp_path, monkeypatch):
+    output = tmp_path / "out.jsonl"
+    output.write_text(json.dumps(DONE) + '\n{"file_path": "b.pdf", "res')
+
+    def fake_batch(paths, **options):
+        for path in paths:
+            yield {"file_path": path, "results": [{"title": "B"}], "error": None}
+
+    monkeypatch.setattr(cli, "iter_books_info_batch", fake_batch)
+    assert run_batch(batch_args(output, ["a.pdf", "b.pdf"])) == 0
+
+    lines = output.read_text().splitlines()
+    assert json.loads(lines[-1])["file_path"] == "b.pdf"
+    assert load_done_paths(str(output)) == {"a.pdf", "b.pdf"}
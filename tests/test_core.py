@@ -0,0 +1,93 @@
+import pytest
+
+import core
+from core import (
+    get_books_info_list,
+    iter_books_info_batch,
+    query_google_books_api,
+    resolve_books_info,
+)
+from lookup_cache import get_lookup_cache
+from utils import isbn10_to_isbn13
+
+QUERY = "isbn:9780306406157"
+ITEM = {
+    "id": "xyz",
+    "volumeInfo": {
+        "title": "Signal Processing",
+        "industryIdentifiers": [{"type": "ISBN_13", "identifier": "9780306406157"}],
+    },
+}
+STALE = [{"id": "old", "volumeInfo": {"title": "Stale Answer"}}]
+EVIDENCE = {"filename": "9780306406157.pdf", "filename_isbns": ["9780306406157"]}
+
+
+def test_cached_query_is_not_sent(caches, client):
+    get_lookup_cache().set(QUERY, STALE)
+    assert query_google_books_api(QUERY, "key") == STALE
+    assert client.queries == []
+
+
+def test_no_cache_query_is_sent(caches, client):
+    client.answers[QUERY] = [ITEM]
+    get_lookup_cache().set(QUERY, STALE)
+    assert query_google_books_api(QUERY, "key", use_cache=False) == [ITEM]
+    assert client.queries == [QUERY]
+    # Nothing is written back either
+    assert get_lookup_cache().get(QUERY) == STALE
+
+
+def test_resolve_without_cache_asks_google(caches, client):
+    client.answers[QUERY] = [ITEM]
+    get_lookup_cache().set(QUERY, STALE)
+    for strategy in ("waterfall", "parallel"):
+        results = resolve_books_info(EVIDENCE, "key", strategy, use_cache=False)
+        assert results[0]["title"] == "Signal Processing"
+    assert client.queries == [QUERY, QUERY]
+
+
+def test_get_books_info_list_without_cache_asks_google(caches, client, tmp_path):
+    client.answers[QUERY] = [ITEM]
+    get_lookup_cache().set(QUERY, STALE)
+    path = tmp_path / "9780306406157.pdf"
+    path.write_bytes(b"%PDF-1.4")
+    results = get_books_info_list(str(path), "key", use_cache=False)
+    assert results[0]["title"] == "Signal Processing"
+    assert client.queries == [QUERY]
+    assert get_books_info_list(str(path), "key")[0]["title"] == "Stale Answer"
+
+
+def isbn_files(tmp_path, count):
+    paths = []
+    for i in range(count):
+        # Any nine digits make a valid ISBN-13 once the check digit is added
+        path = tmp_path / f"{isbn10_to_isbn13(f'03064{i:04d}')}.pdf"
+        path.write_bytes(b"%PDF-1.4")
+        paths.append(str(path))
+    return paths
+
+
+@pytest.mark.parametrize("lookup_cache", ["1", "0"])
+def test_batch_isbn_groups_only_with_the_lookup_cache(
+    tmp_path, caches, client, monkeypatch, lookup_cache
+):
+    monkeypatch.setenv("BOOKINFO_LOOKUP_CACHE", lookup_cache)
+    groups = []
+    resolve_group = core._resolve_isbn_group
+
+    def record_group(group, *args):
+        groups.append(len(group))
+        return resolve_group(group, *args)
+
+    monkeypatch.setattr(core, "_resolve_isbn_group", record_group)
+    paths = isbn_files(tmp_path, 4)
+    entries = list(
+        iter_books_info_batch(paths, "key", parse_workers=1, batch_isbn=True)
+    )
+    assert sorted(entry["file_path"] for entry in entries) == paths
+    assert all(entry["error"] is None for entry in entries)
+    if lookup_cache == "1":
+        assert sum(groups) == 4
+    else:
+        assert groups == []
+        assert len(client.queries) == 4
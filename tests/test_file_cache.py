@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+from core import cached_file_results
+from file_cache import FileResultCache, is_negative
+
+FOUND = [{"title": "Dune", "isbn_13": "9780441013593", "confidence": 1.0}]
+NOT_FOUND = [{"title": None, "source": "not_found"}]
+
+
+def evidence_for(name):
+    return {
+        "filename": name,
+        "filename_isbns": [],
+        "filename_title": None,
+        "exhaustive": True,
+    }
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = FileResultCache(tmp_path / "files.sqlite3", negative_ttl=10)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def book(tmp_path):
+    path = tmp_path / "book.pdf"
+    path.write_bytes(b"%PDF-1.4 " + os.urandom(1024))
+    return path
+
+
+def test_is_negative():
+    assert is_negative(NOT_FOUND)
+    assert is_negative([])
+    assert not is_negative(FOUND)
+
+
+def test_hit_for_unchanged_file(cache, book):
+    cache.set(str(book), FOUND, evidence_for(book.name))
+    assert cache.get(str(book)) == {
+        "results": FOUND,
+        "evidence": evidence_for(book.name),
+    }
+
+
+def test_modified_file_misses(cache, book):
+    cache.set(str(book), FOUND, evidence_for(book.name))
+    book.write_bytes(b"%PDF-1.4 other content")
+    assert cache.get(str(book)) is None
+
+
+def test_negative_results_expire(cache, book, clock):
+    cache.set(str(book), NOT_FOUND, evidence_for(book.name))
+    clock.advance(9)
+    assert cache.get(str(book))["results"] == NOT_FOUND
+    clock.advance(2)
+    assert cache.get(str(book)) is None
+
+
+def test_positive_results_do_not_expire(cache, book, clock):
+    cache.set(str(book), FOUND, evidence_for(book.name))
+    clock.advance(365 * 24 * 3600)
+    assert cache.get(str(book))["results"] == FOUND
+
+
+def test_renamed_file_is_recognized_by_content(cache, book):
+    cache.set(str(book), FOUND, evidence_for(book.name))
+    renamed = book.with_name("moved.pdf")
+    book.rename(renamed)
+    cached = cache.get(str(renamed))
+    assert cached["renamed_from"] == str(book.resolve())
+    assert cached["evidence"]["filename"] == "book.pdf"
+    # The entry of the vanished path is dropped
+    assert cache.get(str(book)) is None
+
+
+def test_renamed_negative_results_expire(cache, book, clock):
+    cache.set(str(book), NOT_FOUND, evidence_for(book.name))
+    renamed = book.with_name("moved.pdf")
+    book.rename(renamed)
+    clock.advance(11)
+    assert cache.get(str(renamed)) is None
+
+
+def test_rename_with_same_filename_evidence_is_reused(cache, book):
+    cache.set(str(book), FOUND, evidence_for(book.name))
+    renamed = book.with_name("moved.pdf")
+    book.rename(renamed)
+    results, evidence = cached_file_results(cache, str(renamed), "waterfall")
+    assert results[0]["title"] == "Dune"
+    assert evidence["filename"] == "moved.pdf"
+    # Stored again under the new name
+    assert "renamed_from" not in cache.get(str(renamed))
+
+
+def test_rename_with_new_filename_isbn_is_parsed_again(cache, book):
+    cache.set(str(book), FOUND, evidence_for(book.name))
+    renamed = book.with_name("9780306406157.pdf")
+    book.rename(renamed)
+    assert cached_file_results(cache, str(renamed), "waterfall") is None
+
+
+def test_parallel_strategy_needs_exhaustive_evidence(cache, book):
+    cache.set(str(book), FOUND, dict(evidence_for(book.name), exhaustive=False))
+    assert cached_file_results(cache, str(book), "waterfall") is not None
+    assert cached_file_results(cache, str(book), "parallel") is None
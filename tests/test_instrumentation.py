@@ -0,0 +1,33 @@
+from instrumentation import PrometheusTextfileSink, Recorder
+
+
+def test_prometheus_sink_keeps_running_aggregates(tmp_path):
+    path = tmp_path / "bookinfo.prom"
+    sink = PrometheusTextfileSink(str(path), write_interval=3600)
+    recorder = Recorder([sink])
+    for seconds in [0.002] * 1000 + [0.3, 100.0]:
+        recorder.emit(
+            {
+                "type": "timer",
+                "name": "lookup",
+                "labels": {"source": "isbn"},
+                "seconds": seconds,
+            }
+        )
+    recorder.count("retries", error="TransientLookupError")
+    recorder.count("retries", 2, error="TransientLookupError")
+    sink.flush()
+
+    # One bucket row per (stage, labels), however many samples were recorded
+    assert len(sink._histograms) == 1
+    lines = path.read_text().splitlines()
+    assert "# TYPE bookinfo_stage_seconds histogram" in lines
+    stage = 'stage="lookup",source="isbn"'
+    assert f'bookinfo_stage_seconds_bucket{{{stage},le="0.001"}} 0' in lines
+    assert f'bookinfo_stage_seconds_bucket{{{stage},le="0.005"}} 1000' in lines
+    assert f'bookinfo_stage_seconds_bucket{{{stage},le="0.5"}} 1001' in lines
+    assert f'bookinfo_stage_seconds_bucket{{{stage},le="60"}} 1001' in lines
+    assert f'bookinfo_stage_seconds_bucket{{{stage},le="+Inf"}} 1002' in lines
+    assert f"bookinfo_stage_seconds_count{{{stage}}} 1002" in lines
+    assert f"bookinfo_stage_seconds_sum{{{stage}}} 102.300000" in lines
+    assert 'bookinfo_retries_total{error="TransientLookupError"} 3' in lines
@@ -0,0 +1,63 @@
+from utils import (
+    find_first_isbn,
+    is_valid_isbn10,
+    is_valid_isbn13,
+    iter_isbn_matches,
+    rank_isbns,
+    to_isbn13,
+)
+
+
+def test_isbn10_checksum():
+    assert is_valid_isbn10("0306406152")
+    assert is_valid_isbn10("080442957X")
+    assert not is_valid_isbn10("0306406153")
+    assert not is_valid_isbn10("X306406152")
+    assert not is_valid_isbn10("030640615")
+
+
+def test_isbn13_checksum():
+    assert is_valid_isbn13("9780306406157")
+    assert not is_valid_isbn13("9780306406158")
+    # Valid EAN-13 checksum, but not a Bookland prefix
+    assert not is_valid_isbn13("4006381333931")
+
+
+def test_to_isbn13():
+    assert to_isbn13("0306406152") == "9780306406157"
+    assert to_isbn13("080442957X") == "9780804429573"
+    assert to_isbn13("9780306406157") == "9780306406157"
+    assert to_isbn13("0306406153") is None
+
+
+def test_matches_are_normalized():
+    text = "ISBN 978-0-306-40615-7, ISBN-10: 0 8044 2957 x"
+    assert [isbn for isbn, _, _ in iter_isbn_matches(text)] == [
+        "9780306406157",
+        "080442957X",
+    ]
+
+
+def test_invalid_checksums_are_skipped():
+    assert list(iter_isbn_matches("978-0-306-40615-8 and 0306406153")) == []
+
+
+def test_digits_before_an_isbn13():
+    # "12 978030640615..." must not be read as an ISBN-10 eating the ISBN-13
+    assert [isbn for isbn, _, _ in iter_isbn_matches("12 9780306406157")] == [
+        "9780306406157"
+    ]
+
+
+def test_rank_isbns_deduplicates_and_prefers_labels():
+    text = (
+        "Also by the author: 9780804429573. "
+        "ISBN 0-306-40615-2 ... ISBN-13: 978-0-306-40615-7"
+    )
+    assert rank_isbns(text) == ["9780306406157", "9780804429573"]
+
+
+def test_find_first_isbn_across_chunks():
+    pages = ["front matter ... ISBN 978-0-30", "6-40615-7 copyright"]
+    assert find_first_isbn(pages) == "9780306406157"
+    assert find_first_isbn(["no numbers here"]) is None
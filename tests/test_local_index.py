@@ -0,0 +1,121 @@
+import json
+
+import pytest
+
+from local_index import LocalIndex, normalize_record
+
+DUNE = {
+    "isbn": "0-441-01359-7",
+    "title": "Dune",
+    "authors": "Frank Herbert",
+    "year": "1965",
+}
+ITEM = {
+    "id": "B1exSQ",
+    "volumeInfo": {
+        "title": "Thinking, Fast and Slow",
+        "authors": ["Daniel Kahneman"],
+        "publishedDate": "2011-10-25",
+        "industryIdentifiers": [{"type": "ISBN_13", "identifier": "9780374275631"}],
+    },
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = LocalIndex(tmp_path / "index.sqlite3")
+    yield index
+    index.close()
+
+
+def test_normalize_record():
+    record = normalize_record(
+        {
+            "isbn13": "978-0-441-01359-3",
+            "title": " Dune ",
+            "author": "F. Herbert; B. Herbert",
+        }
+    )
+    assert record["isbn_13"] == "9780441013593"
+    assert record["title"] == "Dune"
+    assert record["authors"] == ["F. Herbert", "B. Herbert"]
+    assert normalize_record({"isbn": "9780441013593"}) is None
+
+
+def test_mismatched_isbn10_is_dropped():
+    record = normalize_record(
+        {"isbn_13": "9780441013593", "isbn_10": "0306406152", "title": "Dune"}
+    )
+    assert record["isbn_13"] == "9780441013593"
+    assert record["isbn_10"] is None
+
+
+def test_isbn_lookup_accepts_both_forms(index):
+    assert index.add_records([DUNE, {"title": ""}]) == 1
+    assert len(index) == 1
+    item = index.get_isbn("9780441013593")
+    assert item["volumeInfo"]["title"] == "Dune"
+    assert index.get_isbn("0441013597") == item
+    assert index.lookup("isbn:978-0-441-01359-3") == [item]
+    assert index.lookup("isbn:9780306406157") is None
+    assert index.get_isbn("not an isbn") is None
+
+
+def test_google_items_are_returned_unchanged(index):
+    index.add_items([ITEM])
+    assert index.lookup("isbn:9780374275631") == [ITEM]
+
+
+def test_fuzzy_title_search(index):
+    index.add_records([DUNE])
+    index.add_items([ITEM])
+    assert index.lookup("Thinking Fast and Slow") == [ITEM]
+    assert index.lookup("thinking fast and slow daniel kahneman") == [ITEM]
+    # Shares a word, but is another book: Google must be asked
+    assert index.lookup("Thinking in Systems") is None
+    assert index.search("") == []
+
+
+def test_books_without_isbn_are_keyed_by_title_and_author(index):
+    index.add_records(
+        [
+            {"title": "Notes", "authors": "Ann Author"},
+            {"title": "Notes", "authors": "Bob Writer"},
+            {"title": "Notes", "authors": "Ann Author", "year": "2001"},
+        ]
+    )
+    assert len(index) == 2
+
+
+def test_import_dump(index, tmp_path):
+    csv_path = tmp_path / "books.csv"
+    csv_path.write_text(
+        "isbn,title,authors,year\n0441013597,Dune,Frank Herbert,1965\n",
+        encoding="utf-8",
+    )
+    jsonl_path = tmp_path / "results.jsonl"
+    jsonl_path.write_text(
+        "\n".join(
+            [
+                json.dumps(
+                    {
+                        "file_path": "a.pdf",
+                        "results": [
+                            {
+                                "isbn_13": "9780374275631",
+                                "title": "Thinking, Fast and Slow",
+                                "authors_or_editors": ["Daniel Kahneman"],
+                            }
+                        ],
+                    }
+                ),
+                "not json",
+            ]
+        ),
+        encoding="utf-8",
+    )
+    assert index.import_dump(str(csv_path)) == 1
+    assert index.import_dump(str(jsonl_path)) == 1
+    assert index.get_isbn("9780374275631")["volumeInfo"]["authors"] == [
+        "Daniel Kahneman"
+    ]
@@ -0,0 +1,69 @@
+import pytest
+
+from lookup_cache import LookupCache, normalize_query
+
+ITEMS = [{"id": "abc", "volumeInfo": {"title": "Dune"}}]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = LookupCache(tmp_path / "lookups.sqlite3", ttl=100, negative_ttl=10)
+    yield cache
+    cache.close()
+
+
+def test_normalize_query():
+    assert normalize_query("  intitle:Dune   Frank\tHerbert ") == (
+        "intitle:dune frank herbert"
+    )
+
+
+def test_miss_and_hit(cache):
+    assert cache.get("isbn:9780306406157") is None
+    cache.set("isbn:9780306406157", ITEMS)
+    assert cache.get("ISBN:9780306406157 ") == ITEMS
+
+
+def test_positive_entries_expire_after_ttl(cache, clock):
+    cache.set("dune", ITEMS)
+    clock.advance(99)
+    assert cache.get("dune") == ITEMS
+    clock.advance(2)
+    assert cache.get("dune") is None
+
+
+def test_negative_entries_use_the_negative_ttl(cache, clock):
+    cache.set("nothing", [])
+    clock.advance(9)
+    assert cache.get("nothing") == []
+    clock.advance(2)
+    assert cache.get("nothing") is None
+
+
+def test_evict_drops_expired_rows(cache, clock):
+    cache.set("dune", ITEMS)
+    cache.set("nothing", [])
+    clock.advance(11)
+    assert cache.evict() == 1
+    clock.advance(100)
+    assert cache.evict() == 1
+
+
+def test_evict_least_recently_used_above_cap(tmp_path, clock):
+    cache = LookupCache(tmp_path / "lookups.sqlite3", max_entries=2)
+    for query in ("a", "b", "c"):
+        cache.set(query, ITEMS)
+        clock.advance(1)
+    cache.get("a")
+    assert cache.evict() == 1
+    assert cache.get("b") is None
+    assert cache.get("a") == ITEMS and cache.get("c") == ITEMS
+    cache.close()
+
+
+def test_iter_items_skips_empty_and_stale(cache, clock):
+    cache.set("old", ITEMS)
+    clock.advance(101)
+    cache.set("new", ITEMS)
+    cache.set("nothing", [])
+    assert list(cache.iter_items()) == [ITEMS]
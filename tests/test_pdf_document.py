@@ -0,0 +1,81 @@
+import io
+
+import pytest
+from PIL import Image
+
+from pdf_document import PdfDocument
+
+PAGE_SIZE = (200, 300)
+FULL_PAGE = b"q 200 0 0 300 0 0 cm /Im0 Do Q"
+TITLE = b"BT /F1 24 Tf 20 150 Td (My Great Title) Tj ET"
+
+
+def write_pdf(path, content):
+    """
+    Writes a one-page PDF whose page draws ``content`` with a 100x150 JPEG
+    available as /Im0 and Helvetica as /F1.
+    """
+    jpeg = io.BytesIO()
+    Image.new("RGB", (100, 150), (200, 30, 30)).save(jpeg, "JPEG")
+    jpeg = jpeg.getvalue()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d]"
+        b" /Resources << /XObject << /Im0 4 0 R >> /Font << /F1 6 0 R >> >>"
+        b" /Contents 5 0 R >>" % PAGE_SIZE,
+        b"<< /Type /XObject /Subtype /Image /Width 100 /Height 150"
+        b" /ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode"
+        b" /Length %d >>\nstream\n%s\nendstream" % (len(jpeg), jpeg),
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(
+        b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+        % (len(objects) + 1, xref)
+    )
+    path.write_bytes(out.getvalue())
+    return str(path)
+
+
+@pytest.fixture
+def cover(tmp_path):
+    def make(content):
+        return PdfDocument(write_pdf(tmp_path / "cover.pdf", content))
+
+    return make
+
+
+def test_scanned_page_uses_the_embedded_image(cover):
+    with cover(FULL_PAGE) as document:
+        image = document.embedded_page_image(0, (100, 150))
+        assert image is not None and image.format == "JPEG"
+
+
+def test_text_over_the_image_is_rasterized(cover):
+    with cover(FULL_PAGE + b"\n" + TITLE) as document:
+        assert document.embedded_page_image(0, (100, 150)) is None
+        image = document.render_cover((100, 150))
+        # The red background is rendered with the black title over it
+        assert image.format != "JPEG"
+        assert image.convert("L").getextrema()[0] < 60
+
+
+def test_vector_content_over_the_image_is_rasterized(cover):
+    with cover(FULL_PAGE + b"\n0 0 0 RG 10 10 m 190 290 l S") as document:
+        assert document.embedded_page_image(0, (100, 150)) is None
+
+
+def test_image_not_covering_the_page_is_rasterized(cover):
+    with cover(b"q 100 0 0 150 0 0 cm /Im0 Do Q") as document:
+        assert document.embedded_page_image(0, (100, 150)) is None
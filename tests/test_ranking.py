@@ -0,0 +1,87 @@
+from ranking import EvidenceProfile, ensure_ranked, rank_candidates
+
+
+def candidate(title, authors=None, year=None, isbn_13=None, subtitle=None):
+    return {
+        "isbn_10": None,
+        "isbn_13": isbn_13,
+        "title": title,
+        "subtitle": subtitle,
+        "authors_or_editors": authors,
+        "year_of_publication": year,
+        "cover_image_url": None,
+    }
+
+
+EVIDENCE = {
+    "filename": "Herbert - Dune (1965).pdf",
+    "filename_isbns": [],
+    "metadata": {"title": "Dune", "author": "Frank Herbert"},
+    "title_lines": ["DUNE", "Frank Herbert"],
+    "text": "Dune by Frank Herbert. Copyright 1965.",
+}
+
+
+def test_isbn_found_in_the_file_is_certain():
+    evidence = dict(EVIDENCE, text_isbns=["0441013597"])
+    profile = EvidenceProfile(evidence)
+    assert profile.confidence(candidate("Anything", isbn_13="9780441013593")) == 1.0
+
+
+def test_untitled_candidate_scores_zero():
+    assert EvidenceProfile(EVIDENCE).confidence(candidate(None)) == 0.0
+
+
+def test_matching_book_ranks_first():
+    candidates = [
+        candidate("Dune Messiah", ["Frank Herbert"], "1969"),
+        candidate("The Dune Encyclopedia", ["Willis E. McNelly"], "1984"),
+        candidate("Dune", ["Frank Herbert"], "1965"),
+    ]
+    ranked = rank_candidates(candidates, EVIDENCE)
+    assert [c["title"] for c in ranked] == [
+        "Dune",
+        "Dune Messiah",
+        "The Dune Encyclopedia",
+    ]
+    assert ranked[0]["confidence"] > 0.9
+    # The input is left alone
+    assert "confidence" not in candidates[0]
+
+
+def test_author_mismatch_lowers_confidence():
+    profile = EvidenceProfile(EVIDENCE)
+    right = profile.confidence(candidate("Dune", ["Frank Herbert"]))
+    wrong = profile.confidence(candidate("Dune", ["Someone Else"]))
+    assert right > wrong
+
+
+def test_subtitle_and_title_prefix_match():
+    evidence = {
+        "filename": "Thinking, Fast and Slow.pdf",
+        "metadata": {"title": "Thinking, Fast and Slow - Daniel Kahneman"},
+    }
+    profile = EvidenceProfile(evidence)
+    assert profile.features(candidate("Thinking, Fast and Slow"))["title"] >= 0.85
+    assert (
+        profile.features(candidate("Thinking", subtitle="Fast and Slow"))["title"]
+        == 1.0
+    )
+
+
+def test_author_alone_is_not_enough():
+    profile = EvidenceProfile({"metadata": {"author": "Frank Herbert"}})
+    assert profile.confidence(candidate("Dune", ["Frank Herbert"])) == 0.0
+
+
+def test_ties_keep_google_order():
+    candidates = [candidate("Dune", year="2005"), candidate("Dune", year="1990")]
+    ranked = rank_candidates(candidates, EVIDENCE)
+    assert ranked[0]["confidence"] == ranked[1]["confidence"]
+    assert [c["year_of_publication"] for c in ranked] == ["2005", "1990"]
+
+
+def test_ensure_ranked():
+    ranked = rank_candidates([candidate("Dune")], EVIDENCE)
+    assert ensure_ranked(ranked, {}) is ranked
+    assert "confidence" in ensure_ranked([candidate("Dune")], EVIDENCE)[0]
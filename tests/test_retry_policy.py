@@ -0,0 +1,188 @@
+import json
+import socket
+import time
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from errors import (
+    InvalidQueryError,
+    PermanentLookupError,
+    QuotaExceededError,
+    TransientLookupError,
+    classify_error,
+    parse_retry_after,
+)
+from retry_policy import RETRY_ATTEMPTS, CircuitBreaker, lookup_retry
+
+
+def http_error(status, reason="", headers=None):
+    resp = httplib2.Response(dict(headers or {}, status=status))
+    body = {"error": {"code": status, "errors": [{"reason": reason}]}}
+    return HttpError(resp, json.dumps(body).encode("utf-8"))
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(time, "sleep", sleeps.append)
+    return sleeps
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("12") == 12.0
+    assert parse_retry_after("-3") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+
+
+@pytest.mark.parametrize("status", [408, 429, 500, 503])
+def test_transient_statuses(status):
+    error = classify_error(http_error(status, headers={"retry-after": "7"}))
+    assert isinstance(error, TransientLookupError)
+    assert error.status == status
+    assert error.retry_after == 7.0
+
+
+def test_403_rate_limit_is_transient():
+    error = classify_error(http_error(403, "rateLimitExceeded"))
+    assert isinstance(error, TransientLookupError)
+
+
+@pytest.mark.parametrize("reason", ["dailyLimitExceeded", "quotaExceeded"])
+def test_quota_exhaustion(reason):
+    assert isinstance(classify_error(http_error(403, reason)), QuotaExceededError)
+    assert isinstance(classify_error(http_error(429, reason)), QuotaExceededError)
+
+
+def test_permanent_statuses():
+    assert isinstance(classify_error(http_error(400)), InvalidQueryError)
+    for status in (401, 403, 404):
+        error = classify_error(http_error(status))
+        assert type(error) is PermanentLookupError
+
+
+def test_network_failures_are_transient():
+    assert isinstance(classify_error(socket.timeout("timed out")), TransientLookupError)
+    assert isinstance(
+        classify_error(ConnectionResetError("reset")), TransientLookupError
+    )
+    assert isinstance(
+        classify_error(httplib2.ServerNotFoundError("dns")), TransientLookupError
+    )
+
+
+def test_other_exceptions_are_permanent():
+    assert isinstance(classify_error(KeyError("items")), PermanentLookupError)
+    error = InvalidQueryError("bad")
+    assert classify_error(error) is error
+
+
+def test_transient_failures_are_retried(no_sleep):
+    calls = []
+
+    @lookup_retry
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise TransientLookupError("HTTP 503")
+        return "ok"
+
+    assert flaky() == "ok"
+    assert len(calls) == 3
+    assert len(no_sleep) == 2
+
+
+def test_retries_give_up_with_the_last_error(no_sleep):
+    calls = []
+
+    @lookup_retry
+    def down():
+        calls.append(1)
+        raise TransientLookupError("HTTP 503")
+
+    with pytest.raises(TransientLookupError):
+        down()
+    assert len(calls) == RETRY_ATTEMPTS
+
+
+@pytest.mark.parametrize(
+    "error", [PermanentLookupError("HTTP 404"), QuotaExceededError("quota")]
+)
+def test_permanent_and_quota_errors_are_not_retried(no_sleep, error):
+    calls = []
+
+    @lookup_retry
+    def broken():
+        calls.append(1)
+        raise error
+
+    with pytest.raises(type(error)):
+        broken()
+    assert len(calls) == 1
+
+
+def test_retry_waits_at_least_retry_after(no_sleep):
+    calls = []
+
+    @lookup_retry
+    def limited():
+        calls.append(1)
+        if len(calls) == 1:
+            raise TransientLookupError("HTTP 429", 429, retry_after=20)
+        return "ok"
+
+    assert limited() == "ok"
+    assert no_sleep[0] >= 20
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=60)
+    for _ in range(2):
+        breaker.record_failure(TransientLookupError("HTTP 503"))
+    assert not breaker.is_open
+    breaker.record_failure(TransientLookupError("HTTP 503"))
+    assert breaker.is_open
+
+
+def test_breaker_success_resets_the_count():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=60)
+    breaker.record_failure(TransientLookupError("HTTP 503"))
+    breaker.record_success()
+    breaker.record_failure(TransientLookupError("HTTP 503"))
+    assert not breaker.is_open
+
+
+def test_breaker_ignores_permanent_errors():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=60)
+    breaker.record_failure(PermanentLookupError("HTTP 404"))
+    assert not breaker.is_open
+
+
+def test_breaker_honours_retry_after():
+    breaker = CircuitBreaker(failure_threshold=5, cooldown=60)
+    breaker.record_failure(TransientLookupError("HTTP 429", 429, retry_after=30))
+    assert breaker.is_open
+
+
+def test_breaker_sleeps_while_open(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=60)
+    breaker.record_failure(TransientLookupError("HTTP 503"))
+    sleeps = []
+
+    def sleep(delay):
+        # Ends the pause, as if the cooldown had passed
+        sleeps.append(delay)
+        breaker.reset()
+
+    monkeypatch.setattr(time, "sleep", sleep)
+    breaker.before_call()
+    assert len(sleeps) == 1 and 0 < sleeps[0] <= 60
+
+
+def test_breaker_rejects_calls_after_quota_exhaustion():
+    breaker = CircuitBreaker()
+    breaker.record_failure(QuotaExceededError("quota", 403, retry_after=3600))
+    with pytest.raises(QuotaExceededError):
+        breaker.before_call()
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+from PIL import Image
+
+from thumbnails import ThumbnailStore
+
+
+def directory_bytes(store):
+    return sum(size for _, size, _ in store._entries())
+
+
+@pytest.fixture
+def book(tmp_path):
+    path = tmp_path / "book.pdf"
+    path.write_bytes(b"%PDF-1.4 book")
+    return path
+
+
+def test_put_and_get(tmp_path, book):
+    store = ThumbnailStore(tmp_path / "thumbs")
+    assert store.get(str(book)) is None
+    path = store.put(str(book), Image.new("RGBA", (800, 1200), (10, 20, 30, 0)))
+    assert store.get(str(book)) == path
+    with Image.open(path) as image:
+        assert image.size == (200, 300)
+        assert image.mode == "RGB"
+    assert store._total == directory_bytes(store)
+
+
+def test_overwrite_does_not_inflate_the_total(tmp_path, book, monkeypatch):
+    store = ThumbnailStore(tmp_path / "thumbs")
+    store.put(str(book), Image.new("RGB", (400, 600), "red"))
+    size = store._total
+    store.max_bytes = 3 * size
+    sweeps = []
+    monkeypatch.setattr(store, "evict", lambda: sweeps.append(store._total))
+    for _ in range(5):
+        store.put(str(book), Image.new("RGB", (400, 600), "red"))
+    # One thumbnail stays far below the cap: no eviction sweep is needed
+    assert sweeps == []
+    assert store._total == directory_bytes(store) == size
+
+
+def test_evicts_least_recently_used(tmp_path):
+    store = ThumbnailStore(tmp_path / "thumbs")
+    books = []
+    for i in range(3):
+        path = tmp_path / f"book{i}.pdf"
+        path.write_bytes(f"%PDF-1.4 book {i}".encode())
+        books.append(str(path))
+    first = store.put(books[0], Image.new("RGB", (400, 600), "red"))
+    store.max_bytes = int(store._total * 2.5)
+    second = store.put(books[1], Image.new("RGB", (400, 600), "red"))
+    os.utime(second, (1000, 1000))
+    os.utime(first, (2000, 2000))
+    store.put(books[2], Image.new("RGB", (400, 600), "red"))
+    assert store.get(books[1]) is None
+    assert store.get(books[0]) == first
+    assert store.get(books[2]) is not None